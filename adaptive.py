@@ -0,0 +1,259 @@
+# adaptive.py
+"""
+Adaptive inference for main.py --adaptive / --target-fps: do less work per
+frame when the picture allows it.
+
+  motion gate   a 32x24 grey thumbnail of the region of interest is compared
+                with the one from the last inferred frame; when the mean
+                absolute difference is below `motion_threshold` the frame is
+                not inferred and the previous landmarks and label are sent
+                again with held = True (at most `max_skip` frames in a row)
+  ROI crop      only the box around the previous frame's landmarks (plus
+                `margin`) is converted and handed to pose.process; landmarks
+                are mapped back to full-frame coordinates and mirrored. The box
+                only moves when the body nears its edge, so MediaPipe's own
+                tracker sees a steady image
+  downsample    crops whose long side exceeds `max_side` are resized first
+                (the model runs at 256 px anyway)
+  budget        with target_fps, BudgetController moves model_complexity
+                down when inference overruns the frame budget and back up
+                when there is headroom; one Pose per complexity is kept
+
+`counters` says how many inference calls were saved. Through stats.py
+(--stats-http) they show up next to the per-stage timings.
+
+`python adaptive.py video.mp4` compares full-frame and adaptive inference
+on a recorded video: calls, time per frame, and label agreement.
+"""
+import time
+import cv2
+from poses import classify_pose, mirror_landmarks
+
+THUMB = (32, 24)
+
+class BudgetController:
+    """
+    Holds inference time under 1000 / target_fps ms by stepping the model
+    complexity. A level that overran is not retried for `ban` frames, and
+    the ban doubles each time so the controller cannot oscillate.
+    """
+    def __init__(self, target_fps, level=0, levels=(0, 1, 2), alpha=0.05, settle=30, headroom=0.45,
+                 ban=900):
+        self.budget_ms = 1000.0 / target_fps
+        self.levels = levels
+        self.level = level
+        self.alpha = alpha
+        self.settle = settle            # frames ignored after a switch (model warm-up)
+        self.headroom = headroom        # step up only below this share of the budget
+        self.ban = ban
+        self.banned = {}                # level -> (until frame, ban length)
+        self.frame = 0
+        self.ema = None
+        self.wait = settle
+
+    def update(self, ms):
+        """Feed one inference time; returns the level to use for the next frame."""
+        self.frame += 1
+        if self.wait > 0:
+            self.wait -= 1
+            return self.level
+        self.ema = ms if self.ema is None else self.ema + self.alpha * (ms - self.ema)
+        i = self.levels.index(self.level)
+        if self.ema > self.budget_ms and i > 0:
+            _, length = self.banned.get(self.level, (0, self.ban // 2))
+            self.banned[self.level] = (self.frame + 2 * length, 2 * length)
+            self._switch(self.levels[i - 1])
+        elif self.ema < self.budget_ms * self.headroom and i + 1 < len(self.levels):
+            up = self.levels[i + 1]
+            if self.banned.get(up, (0, 0))[0] <= self.frame:
+                self._switch(up)
+        return self.level
+
+    def disable(self, level):
+        """Never pick `level` again (e.g. its model failed to load)."""
+        self.levels = tuple(l for l in self.levels if l != level)
+
+    def _switch(self, level):
+        self.level = level
+        self.ema = None
+        self.wait = self.settle
+
+class AdaptiveInference:
+    """Drop-in for main.infer(pose, s): `ai.infer(s)` fills s.results, s.label and s.lat."""
+    def __init__(self, make_pose, complexity=0, roi=True, gate=True, target_fps=None,
+                 motion_threshold=2.0, max_skip=5, max_side=384, margin=0.35, smoother=None):
+        self.make_pose = make_pose      # complexity -> mp_pose.Pose
+        self.smoother = smoother        # optional smoothing.py filter
+        self.poses = {complexity: make_pose(complexity)}
+        self.complexity = complexity
+        self.pose = self.poses[complexity]
+        self.budget = BudgetController(target_fps, complexity) if target_fps else None
+        self.roi_on = roi
+        self.gate = gate
+        self.motion_threshold = motion_threshold
+        self.max_skip = max_skip
+        self.max_side = max_side
+        self.margin = margin
+
+        self.roi = None                 # (x0, y0, x1, y1) pixels in the mirrored frame; None = whole frame
+        self.size = None                # (w, h) the roi refers to
+        self.thumb = None               # motion reference from the last inferred frame
+        self.last = None                # (results, label) of the last inferred frame
+        self.skip_run = 0
+        self.small = None               # reused resize / colour conversion destinations
+        self.rgb = None
+        self.counters = {"frames": 0, "inferred": 0, "skipped": 0, "cropped": 0, "downsampled": 0,
+                         "complexity": complexity, "switches": 0}
+
+    def infer(self, s):
+        lat, clock, c = s.lat, time.perf_counter, self.counters
+        c["frames"] += 1
+        t0 = clock()
+        frame = s.frame
+        h, w = frame.shape[:2]
+        if self.size != (w, h):
+            self.size, self.roi, self.thumb = (w, h), None, None
+        x0, y0, x1, y1 = self.roi or (0, 0, w, h)
+        crop = frame[y0:y1, w - x1:w - x0]      # the roi is in mirrored coordinates
+
+        if self.gate:
+            thumb = cv2.cvtColor(cv2.resize(crop, THUMB, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+            still = self.thumb is not None and self.last is not None and self.skip_run < self.max_skip and \
+                cv2.norm(thumb, self.thumb, cv2.NORM_L1) / thumb.size < self.motion_threshold
+            t1 = clock(); lat["motion"] = round((t1 - t0) * 1000.0, 2)
+            if still:
+                self.skip_run += 1
+                c["skipped"] += 1
+                s.results, s.label = self.last
+                s.held = True
+                return
+            self.thumb = thumb
+            t0 = t1
+        self.skip_run = 0
+
+        img = crop
+        cw, ch = x1 - x0, y1 - y0
+        if self.roi is not None:
+            c["cropped"] += 1
+        if max(cw, ch) > self.max_side:
+            k = self.max_side / max(cw, ch)
+            # dst is reused while the roi keeps its size; OpenCV reallocates when it doesn't fit
+            img = self.small = cv2.resize(crop, (max(1, round(cw * k)), max(1, round(ch * k))),
+                                          dst=self.small, interpolation=cv2.INTER_AREA)
+            c["downsampled"] += 1
+        t1 = clock(); lat["crop"] = round((t1 - t0) * 1000.0, 2)
+        rgb = self.rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        t2 = clock(); lat["cvtColor"] = round((t2 - t1) * 1000.0, 2)
+        s.results = self.pose.process(rgb)
+        t3 = clock(); lat["process"] = round((t3 - t2) * 1000.0, 2)
+        c["inferred"] += 1
+
+        if s.results.pose_landmarks is not None:
+            lms = s.results.pose_landmarks.landmark
+            if self.roi is not None:
+                self._to_frame(lms, w - x1, y0, cw, ch, w, h)
+            mirror_landmarks(lms)
+            if self.smoother is not None:
+                self.smoother.apply(lms, s.t_cap)
+            s.label = classify_pose(lms) or ""
+        elif self.smoother is not None:
+            self.smoother.reset()
+        t4 = clock(); lat["classify"] = round((t4 - t3) * 1000.0, 2)
+        self.last = (s.results, s.label)
+
+        if self.roi_on:
+            self._update_roi(s.results, w, h)
+        if self.budget is not None:
+            self._set_complexity(self.budget.update((t4 - t0) * 1000.0))
+
+    @staticmethod
+    def _to_frame(lms, x0, y0, cw, ch, w, h):
+        """Map crop-normalized landmarks back to (unmirrored) full-frame ones, in place."""
+        sx, sy = cw / w, ch / h
+        ox, oy = x0 / w, y0 / h
+        for p in lms:
+            p.x = ox + p.x * sx
+            p.y = oy + p.y * sy
+            p.z = p.z * sx          # z uses the same scale as x
+
+    def _update_roi(self, results, w, h):
+        if results.pose_landmarks is None:
+            self.roi = self.thumb = None
+            return
+        lms = results.pose_landmarks.landmark
+        xs = [min(max(p.x, 0.0), 1.0) * w for p in lms]
+        ys = [min(max(p.y, 0.0), 1.0) * h for p in lms]
+        bx0, bx1, by0, by1 = min(xs), max(xs), min(ys), max(ys)
+        pad = self.margin * max(bx1 - bx0, by1 - by0, 1.0)
+
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            inner = pad / 2                 # keep the box while the body stays well inside it
+            fits = x0 <= bx0 - inner and y0 <= by0 - inner and bx1 + inner <= x1 and by1 + inner <= y1
+            loose = (x1 - x0) * (y1 - y0) > 2.5 * (bx1 - bx0 + 2 * pad) * (by1 - by0 + 2 * pad)
+            if fits and not loose:
+                return
+
+        x0, y0 = max(0, int(bx0 - pad)), max(0, int(by0 - pad))
+        x1, y1 = min(w, int(bx1 + pad) + 1), min(h, int(by1 + pad) + 1)
+        roi = None if (x1 - x0) * (y1 - y0) > 0.8 * w * h else (x0, y0, x1, y1)
+        if roi != self.roi:
+            self.roi, self.thumb = roi, None
+
+    def _set_complexity(self, level):
+        if level == self.complexity:
+            return
+        pose = self.poses.get(level)
+        if pose is None:
+            try:
+                pose = self.poses[level] = self.make_pose(level)
+            except Exception as e:      # e.g. the heavy model can't be downloaded
+                print(f"adaptive: model_complexity={level} unavailable ({e}); staying at {self.complexity}")
+                self.budget.disable(level)
+                self.budget.level = self.complexity
+                return
+        self.pose = pose
+        self.complexity = self.counters["complexity"] = level
+        self.counters["switches"] += 1
+        self.roi = self.thumb = self.last = None     # the new graph starts without tracking
+
+    def summary(self):
+        c = self.counters
+        saved = c["skipped"] / max(1, c["frames"])
+        return (f"adaptive: {c['inferred']}/{c['frames']} frames inferred ({saved:.0%} skipped), "
+                f"{c['cropped']} cropped, {c['downsampled']} downsampled, "
+                f"complexity {c['complexity']} after {c['switches']} switches")
+
+if __name__ == "__main__":
+    import sys
+    import mediapipe as mp
+    from main import Sample, infer
+
+    if len(sys.argv) < 2:
+        raise SystemExit("usage: python adaptive.py VIDEO [--target-fps N]")
+    target = float(sys.argv[sys.argv.index("--target-fps") + 1]) if "--target-fps" in sys.argv else None
+    make_pose = lambda c: mp.solutions.pose.Pose(model_complexity=c, enable_segmentation=False)
+
+    def run(step):
+        cap = cv2.VideoCapture(sys.argv[1])
+        labels, secs = [], 0.0
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            s = Sample(frame, time.time())
+            t0 = time.perf_counter()
+            step(s)
+            secs += time.perf_counter() - t0
+            labels.append(s.label)
+        cap.release()
+        return labels, secs
+
+    full, t_full = run(lambda s, pose=make_pose(0): infer(pose, s))
+    ai = AdaptiveInference(make_pose, target_fps=target)
+    adapt, t_adapt = run(ai.infer)
+    n = max(1, len(full))
+    same = sum(a == b for a, b in zip(full, adapt)) / n
+    print(f"full     {t_full / n * 1000:6.2f} ms/frame")
+    print(f"adaptive {t_adapt / n * 1000:6.2f} ms/frame, labels agree on {same:.1%} of {n} frames")
+    print(ai.summary())
@@ -0,0 +1,247 @@
+# bench.py
+"""
+Benchmarks for the per-frame hot path; no camera needed.
+
+  python bench.py                         # synthetic landmarks
+  python bench.py --trace session/        # also run on a recorded trace
+  python bench.py -o HEAD.json            # save machine-readable results
+  python bench.py --compare base.json     # print speedups against an earlier run
+
+Each case reports ops/s, p50/p99 latency per call, the peak transient
+memory allocated by one call (tracemalloc) as the allocations-per-frame
+figure, and gen-0 GC collections per 1000 calls as GC pressure (only
+container objects that outlive the call trigger those).
+"""
+import gc, sys, json, time, types, socket, argparse, platform, subprocess, tracemalloc
+import numpy as np
+import cv2
+import poses, wire, rules
+from main import to_packet
+import stabilizer
+from delta import DeltaEncoder, synthetic_session
+
+CASES = []      # (name, setup(data) -> zero-arg callable, per_dataset)
+
+def case(name, per_dataset=False):
+    def register(setup):
+        CASES.append((name, setup, per_dataset))
+        return setup
+    return register
+
+def cycle(items):
+    """Zero-arg callable returning the next item each call (cheap index, no generator frames)."""
+    i = [0]
+    n = len(items)
+    def nxt():
+        i[0] = (i[0] + 1) % n
+        return items[i[0]]
+    return nxt
+
+class Data:
+    """Landmarks in every shape the hot path sees them."""
+    def __init__(self, name, arrays):
+        self.name = name
+        arrays = [a for a in arrays if not np.isnan(a).any()]
+        self.arrays = np.asarray(arrays, np.float32)
+        self.lms = [poses.landmarks_from_array(a) for a in self.arrays]
+        self.results = [types.SimpleNamespace(pose_landmarks=types.SimpleNamespace(landmark=l))
+                        for l in self.lms]
+        self.labels = [poses.classify_pose(l) for l in self.lms]
+
+# ---------- cases ----------
+@case("torso_scale", per_dataset=True)
+def _(data):
+    nxt = cycle(data.lms)
+    return lambda: poses.torso_scale(nxt())
+
+@case("angle", per_dataset=True)
+def _(data):
+    P = poses.pt
+    nxt = cycle([(P(l, "LEFT_SHOULDER"), P(l, "LEFT_ELBOW"), P(l, "LEFT_WRIST")) for l in data.lms])
+    return lambda: poses.angle(*nxt())
+
+@case("classify_pose", per_dataset=True)
+def _(data):
+    nxt = cycle(data.lms)
+    return lambda: poses.classify_pose(nxt())
+
+@case("rules.compile")
+def _(data):
+    # Hot-reload turnaround: parse + compile pose_rules.json
+    return lambda: rules.load_rules()
+
+@case("classify_batch/frame", per_dataset=True)
+def _(data):
+    # Whole dataset per call; ops are scaled to frames in run()
+    arr = data.arrays
+    fn = lambda: poses.classify_batch(arr)
+    fn.frames = len(arr)
+    return fn
+
+def vote_case(make):
+    def setup(data):
+        stab = make()
+        nxt = cycle(data.labels)
+        clock = [0.0]
+        def vote():
+            clock[0] += 1 / 30
+            return stab.update(nxt(), clock[0], 0.9)
+        return vote
+    return setup
+
+case("vote")(vote_case(stabilizer.MajorityVote))
+case("vote/150ms")(vote_case(lambda: stabilizer.MajorityVote(window_ms=150)))
+case("vote/weighted")(vote_case(lambda: stabilizer.WeightedVote(window_ms=150)))
+case("vote/hysteresis")(vote_case(stabilizer.Hysteresis))
+
+# Frame path before and after landmark-space mirroring (main.infer); one 640x480 frame
+def camera_frame():
+    return np.random.default_rng(0).integers(0, 256, (480, 640, 3), np.uint8)
+
+@case("frame/flip+cvtColor")
+def _(data):
+    frame = camera_frame()
+    return lambda: cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+
+@case("frame/cvtColor(dst)+mirror")
+def _(data):
+    from mediapipe.framework.formats import landmark_pb2
+    frame = camera_frame()
+    rgb = np.empty_like(frame)
+    lms = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, v in data.arrays[0].tolist():
+        lms.landmark.add(x=x, y=y, z=z, visibility=v)
+    def fn():
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        poses.mirror_landmarks(lms.landmark)
+    return fn
+
+@case("to_packet+json")
+def _(data):
+    nxt = cycle(data.results)
+    def encode():
+        pkt = to_packet(nxt(), 30.0, ["Stop Pose"], "Stop Pose", False, True)
+        return json.dumps(pkt, separators=(",",":"), allow_nan=False).encode("utf-8")
+    return encode
+
+@case("wire.encode")
+def _(data):
+    nxt = cycle(data.arrays)
+    return lambda: wire.encode(nxt(), 0, 0.0, 0.0, 30.0, "Stop Pose", False, "Stop Pose")
+
+@case("delta.encode")
+def _(data):
+    enc = DeltaEncoder()
+    nxt = cycle(data.arrays)
+    return lambda: enc.encode(nxt(), 0, 0.0, 0.0, 30.0, "Stop Pose", False, "Stop Pose")
+
+@case("sendto")
+def _(data):
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    addr = sink.getsockname()
+    pkt = to_packet(data.results[0], 30.0, [], "", False, True)
+    buf = json.dumps(pkt, separators=(",",":")).encode("utf-8")
+    fn = lambda: tx.sendto(buf, addr)
+    fn.keep = (sink, tx)    # unread datagrams are dropped by the kernel; that's fine here
+    return fn
+
+# ---------- runner ----------
+def run(fn, seconds):
+    frames = getattr(fn, "frames", 1)
+    for _ in range(50):     # warm-up
+        fn()
+
+    samples = []
+    clock = time.perf_counter_ns
+    deadline = clock() + int(seconds * 1e9)
+    t0 = clock()
+    while clock() < deadline:
+        a = clock()
+        fn()
+        samples.append(clock() - a)
+    total = clock() - t0
+    ns = np.sort(np.asarray(samples, np.float64)) / frames
+
+    n_alloc = min(len(samples), 200)
+    gc0 = gc.get_stats()[0]["collections"]
+    for _ in range(n_alloc * 5):
+        fn()
+    gc0 = gc.get_stats()[0]["collections"] - gc0
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    peak = 0
+    for _ in range(n_alloc):
+        tracemalloc.reset_peak()
+        fn()
+        peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    return {
+        "ops_per_s": round(len(samples) * frames / (total / 1e9), 1),
+        "p50_us": round(float(ns[len(ns) // 2]) / 1e3, 3),
+        "p99_us": round(float(ns[int(len(ns) * 0.99)]) / 1e3, 3),
+        "peak_bytes": int(peak / n_alloc / frames),
+        "gc0_per_1k": round(gc0 * 1000 / (n_alloc * 5 * frames), 2),
+        "calls": len(samples),
+    }
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the per-frame hot path.")
+    ap.add_argument("--trace", help="also benchmark landmark cases on a recorded trace")
+    ap.add_argument("--seconds", type=float, default=0.5, help="time per case")
+    ap.add_argument("-k", "--filter", default="", help="only run cases whose name contains this")
+    ap.add_argument("-o", "--out", help="write JSON results here (default: stdout)")
+    ap.add_argument("--compare", help="earlier JSON results to compare against")
+    args = ap.parse_args()
+
+    datasets = [Data("synthetic", synthetic_session(600))]
+    if args.trace:
+        from recording import Trace
+        datasets.append(Data("trace", np.asarray(Trace(args.trace).landmarks)))
+
+    results = {}
+    for name, setup, per_dataset in CASES:
+        for data in (datasets if per_dataset else datasets[:1]):
+            key = f"{name}[{data.name}]" if per_dataset else name
+            if args.filter not in key:
+                continue
+            results[key] = r = run(setup(data), args.seconds)
+            print(f"{key:32} {r['ops_per_s']:>14,.0f} ops/s  p50 {r['p50_us']:9.3f}us  "
+                  f"p99 {r['p99_us']:9.3f}us  {r['peak_bytes']:7d} B  gc0 {r['gc0_per_1k']:6.2f}/1k",
+                  file=sys.stderr)
+
+    report = {
+        "commit": git_rev(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "results": results,
+    }
+    out = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)["results"]
+        print(f"\nvs {args.compare}:", file=sys.stderr)
+        for key, r in results.items():
+            if key in base:
+                print(f"  {key:32} {r['ops_per_s'] / base[key]['ops_per_s']:6.2f}x", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
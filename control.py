@@ -0,0 +1,169 @@
+# control.py
+"""
+On-demand inference for main.py --control PORT / --idle-after SECS.
+
+Consumers steer the sender with JSON datagrams to the control port (each
+gets {"op": "ack", ...state} back):
+
+  {"op": "pause"}                             stop reading frames and inferring
+  {"op": "resume"}                            back to full speed
+  {"op": "throttle", "rate": 5, "landmarks": false}
+      infer at most `rate` frames/s (0 = every frame); landmarks false
+      sends labels only (packets keep `tracking` but carry no landmarks)
+  {"op": "heartbeat"}  /  {"op": "status"}    any datagram counts as a heartbeat
+
+With --idle-after, the sender goes idle when no consumer has sent anything
+(here or to the --serve fan-out port) for that many seconds, and starts
+idle until the first one arrives. Paused or idle, the capture loop blocks
+on a condition variable, so the process uses next to no CPU. The camera
+is parked (left open, not read) or, with --idle-release, released and
+reopened on resume, which saves the driver's work and turns the camera
+light off but makes resuming slower.
+
+Each resume reports the time from the datagram that woke the sender to
+its first packet (`resume_ms`, printed and listed under --stats-http).
+"""
+import json, math, time, socket, threading
+
+class Control:
+    def __init__(self, idle_after=None, release=False, reopen=None):
+        self.idle_after = idle_after
+        self.release = release
+        self.reopen = reopen            # fn() -> capture, for release mode
+        self.cap = None                 # capture in use, kept up to date by gate()
+        self.paused = False
+        self.rate = 0.0                 # max frames/s; 0 = every frame
+        self.landmarks = True
+        self._cond = threading.Condition()
+        self.last_seen = -math.inf if idle_after else time.monotonic()
+        self.woken = None               # perf_counter of the datagram that ended a pause/idle
+        self.resumed = None             # set while waiting for the first packet after it
+        self.next_due = 0.0
+        self.counters = {"pauses": 0, "idles": 0, "resumes": 0, "resume_ms": 0.0}
+
+    def active(self, now=None):
+        if self.paused:
+            return False
+        if self.idle_after is None:
+            return True
+        return (time.monotonic() if now is None else now) - self.last_seen < self.idle_after
+
+    def heartbeat(self):
+        with self._cond:
+            was = self.active()
+            self.last_seen = time.monotonic()
+            self._wake(was)
+
+    def _wake(self, was):
+        if not was and self.active():
+            self.woken = time.perf_counter()
+            self._cond.notify_all()
+
+    def command(self, msg):
+        """Apply one control message; returns the reply."""
+        op = msg.get("op", "heartbeat")
+        with self._cond:
+            was = self.active()
+            self.last_seen = time.monotonic()
+            if op == "pause":
+                self.paused = True
+            elif op == "resume":
+                self.paused, self.rate, self.landmarks = False, 0.0, True
+            elif op == "throttle":
+                rate = msg.get("rate", 0)
+                if isinstance(rate, bool) or not isinstance(rate, (int, float)) or not 0 <= rate < math.inf:
+                    return {"op": "error", "error": f"rate must be a finite number >= 0, not {rate!r}"}
+                self.paused = False
+                self.rate = float(rate)
+                self.landmarks = bool(msg.get("landmarks", True))
+            elif op not in ("heartbeat", "status"):
+                return {"op": "error", "error": f"unknown op {op!r}"}
+            self._wake(was)
+        return dict(self.state(), op="ack")
+
+    def state(self):
+        return {"paused": self.paused, "idle": not self.paused and not self.active(), "rate": self.rate,
+                "landmarks": self.landmarks, "idle_after": self.idle_after, "resume_ms": self.counters["resume_ms"]}
+
+    def gate(self, cap):
+        """
+        Call before each cap.read(): blocks while paused or idle, then paces
+        a throttle. Returns the capture to read from (a new one after a
+        release).
+        """
+        if not self.active():
+            cap = self._sleep(cap)
+        if self.rate:
+            now = time.perf_counter()
+            if self.next_due > now:
+                time.sleep(self.next_due - now)
+                now = self.next_due
+            self.next_due = max(self.next_due + 1.0 / self.rate, now)
+        self.cap = cap
+        return cap
+
+    def _sleep(self, cap):
+        state = "paused" if self.paused else "idle"
+        self.counters["pauses" if self.paused else "idles"] += 1
+        print(f"control: {state}" + (", camera released" if self.release else ""))
+        if self.release and cap is not None:
+            cap.release()
+            cap = None
+        with self._cond:
+            while not self.active():
+                # woken by datagrams; the timeout only bounds how late an idle_after change is seen
+                self._cond.wait(1.0)
+        if cap is None:
+            cap = self.reopen()
+        else:
+            cap.grab()              # drop the frame the driver held while parked
+        self.resumed = self.woken if self.woken is not None else time.perf_counter()
+        self.woken = None
+        self.counters["resumes"] += 1
+        return cap
+
+    def sent(self):
+        """Call after each packet; closes a resume-to-first-packet measurement."""
+        if self.resumed is not None:
+            ms = round((time.perf_counter() - self.resumed) * 1000.0, 1)
+            self.resumed = None
+            self.counters["resume_ms"] = ms
+            print(f"control: resumed, first packet after {ms:.0f} ms")
+
+def serve(control, port, host="127.0.0.1"):
+    """Answer control datagrams on host:port from a daemon thread."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+
+    def loop():
+        while True:
+            data, addr = sock.recvfrom(4096)
+            try:
+                msg = json.loads(data)
+                reply = control.command(msg) if isinstance(msg, dict) else {"op": "error", "error": "not an object"}
+            except (TypeError, ValueError) as e:
+                reply = {"op": "error", "error": str(e)}
+            sock.sendto(json.dumps(reply, separators=(",",":")).encode("utf-8"), addr)
+
+    threading.Thread(target=loop, name="control", daemon=True).start()
+    return sock
+
+def send(msg, port, host="127.0.0.1", timeout=1.0):
+    """Client helper: one control message, returns the reply."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
+    try:
+        sock.sendto(json.dumps(msg).encode("utf-8"), (host, port))
+        return json.loads(sock.recv(4096))
+    finally:
+        sock.close()
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 3:
+        raise SystemExit("usage: python control.py PORT pause|resume|status|heartbeat|throttle [RATE [labels]]")
+    msg = {"op": sys.argv[2]}
+    if msg["op"] == "throttle":
+        msg["rate"] = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+        msg["landmarks"] = "labels" not in sys.argv[4:]
+    print(send(msg, int(sys.argv[1])))
@@ -0,0 +1,170 @@
+# delta.py
+"""
+Keyframe + delta landmark streaming on top of the binary format in wire.py.
+
+The encoder sends a full KEYFRAME every `keyframe_every` tracked frames and,
+in between, a DELTA holding only landmarks that moved more than `eps` (or
+whose visibility moved more than `vis_eps`) relative to what the receiver
+already has. The encoder tracks the receiver's state in wire units, so an
+in-order receiver reconstructs exactly dequantize(encoder.ref).
+
+A DELTA is applied on top of the previous packet, so after a sequence gap
+the receiver drops landmarks until the next keyframe (or asks for one; see
+DeltaEncoder.request_keyframe). Gesture fields are still valid meanwhile.
+
+Run `python delta.py [TRACE]` to check reconstruction and bandwidth on a
+recorded trace (see recording.py) or a synthetic session.
+"""
+import numpy as np
+import wire
+
+class DeltaEncoder:
+    def __init__(self, keyframe_every=30, eps=0.004, vis_eps=0.1):
+        self.keyframe_every = keyframe_every
+        self.eps_q = eps * wire.SCALE[0]
+        self.vis_eps_q = vis_eps * wire.SCALE[3]
+        self.ref = None          # receiver's landmarks, wire units
+        self.since_key = 0
+        self.force_key = False
+
+    def request_keyframe(self):
+        self.force_key = True
+
+    def encode(self, lm, seq, t, t_cap, fps, gesture, changed, raw="", flags=0, player=0, event=0):
+        if lm is None:
+            self.ref = None
+            return wire.pack(None, seq, t, t_cap, fps, gesture, changed, raw, flags, player=player, event=event)
+
+        q = wire.quantize(lm)
+        if self.ref is None or self.force_key or self.since_key >= self.keyframe_every \
+                or len(q) != len(self.ref):
+            self.ref = q
+            self.since_key = 1
+            self.force_key = False
+            return wire.pack(q, seq, t, t_cap, fps, gesture, changed, raw, flags | wire.KEYFRAME, player=player,
+                             event=event)
+
+        d = np.abs(q - self.ref)
+        moved = (d[:, :3] > self.eps_q).any(axis=1) | (d[:, 3] > self.vis_eps_q)
+        ids = np.flatnonzero(moved)
+        self.ref[ids] = q[ids]
+        self.since_key += 1
+        return wire.pack(q[ids], seq, t, t_cap, fps, gesture, changed, raw, flags, ids, player, event)
+
+class DeltaDecoder:
+    """Receiver side: rebuilds full landmark arrays from keyframes and deltas (one per player)."""
+    def __init__(self):
+        self.state = None        # (n, 4) float32 landmarks, or None until a keyframe
+        self.expect = None       # next sequence number
+        self.lost = 0
+        self.need_keyframe = False
+
+    def feed(self, buf):
+        """Decode one packet; landmarks is None while waiting for a keyframe."""
+        pkt = wire.decode(buf)
+        seq = pkt["seq"]
+        if self.expect is not None and seq != self.expect:
+            self.lost += (seq - self.expect) & 0xFFFFFFFF
+            self.need_keyframe = True
+        self.expect = (seq + 1) & 0xFFFFFFFF
+
+        if not pkt["tracking"]:
+            self.state = None
+            self.need_keyframe = False
+        elif pkt["flags"] & wire.KEYFRAME:
+            self.state = pkt["landmarks"].copy()
+            self.need_keyframe = False
+        elif not pkt["flags"] & wire.DELTA:
+            # tracking but no body (labels-only throttle, see control.py): the encoder
+            # dropped its reference, so the next body is a keyframe
+            self.state = None
+            self.need_keyframe = True
+            pkt["landmarks"] = None
+            return pkt
+        elif self.state is None or self.need_keyframe:
+            self.state = None
+            self.need_keyframe = True
+            pkt["landmarks"] = None
+            return pkt
+        else:
+            self.state[pkt["ids"]] = pkt["landmarks"]
+
+        pkt["landmarks"] = None if self.state is None else self.state.copy()
+        return pkt
+
+def measure(frames, fps=30.0, **opts):
+    """Stream (N, 33, 4) frames (NaN rows = not tracking) through both formats.
+
+    Returns (full_bytes, delta_bytes, max_error) where max_error is the
+    worst x/y/z reconstruction error against the original landmarks.
+    """
+    enc, dec = DeltaEncoder(**opts), DeltaDecoder()
+    full = sent = 0
+    err = 0.0
+    for i, lm in enumerate(frames):
+        lm = None if np.isnan(lm).any() else lm
+        t = i / fps
+        full += len(wire.encode(lm, i, t, t, fps, "", False))
+        buf = enc.encode(lm, i, t, t, fps, "", False)
+        sent += len(buf)
+        out = dec.feed(buf)["landmarks"]
+        if lm is not None:
+            if not np.array_equal(out, wire.dequantize(enc.ref)):
+                raise AssertionError(f"frame {i}: receiver diverged from encoder state")
+            err = max(err, float(np.abs(out - lm)[:, :3].max()))
+    return full, sent, err
+
+def synthetic_session(n=900, seed=0):
+    """Standing player: slow drift plus MediaPipe-like jitter, one arm moving."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.3, 0.7, (33, 4)).astype(np.float32)
+    base[:, 3] = 0.95
+    drift = np.cumsum(rng.normal(0.0, 0.0005, (n, 1, 4)), axis=0)
+    frames = base + drift + rng.normal(0.0, 0.0015, (n, 33, 4))
+    frames[:, 15, :2] += 0.1 * np.sin(np.arange(n) / 10.0)[:, None]   # left wrist waving
+    frames[:, :, 3] = np.clip(frames[:, :, 3], 0.0, 1.0)
+    return frames.astype(np.float32)
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        from recording import Trace
+        trace = Trace(sys.argv[1])
+        frames = np.asarray(trace.landmarks)
+        fps = (len(trace) - 1) / max(1e-9, float(trace.t[-1] - trace.t[0]))
+    else:
+        frames = synthetic_session()
+        fps = 30.0
+
+    full, sent, err = measure(frames, fps, eps=0.0, vis_eps=0.0)
+    print(f"eps=0: bit-exact reconstruction, {sent / full:.0%} of full-frame bytes")
+    for eps in (0.002, 0.004, 0.008):
+        full, sent, err = measure(frames, fps, eps=eps)
+        secs = len(frames) / fps
+        print(f"eps={eps}: {full / secs / 1024:.1f} -> {sent / secs / 1024:.1f} KiB/s "
+              f"({1 - sent / full:.0%} saved), max error {err:.4f}")
+
+    # Loss: drop every 50th packet, receiver must resync on the next keyframe
+    enc, dec = DeltaEncoder(), DeltaDecoder()
+    stale = 0
+    for i, lm in enumerate(frames):
+        lm = None if np.isnan(lm).any() else lm
+        buf = enc.encode(lm, i, 0.0, 0.0, fps, "", False)
+        if i % 50 == 49:
+            continue
+        if dec.feed(buf)["landmarks"] is None:
+            stale += 1
+    print(f"loss: {dec.lost} packets lost, {stale} frames waited for a keyframe")
+
+    # Labels-only packets (TRACKING, no body) between bodies: no landmarks, then resync on a keyframe
+    enc, dec = DeltaEncoder(), DeltaDecoder()
+    for i, lm in enumerate(frames[:40]):
+        labels_only = 10 <= i < 20
+        buf = enc.encode(None if labels_only else lm, i, 0.0, 0.0, fps, "", False,
+                         flags=wire.TRACKING if labels_only else 0)
+        pkt = dec.feed(buf)
+        if labels_only:
+            assert pkt["tracking"] and pkt["landmarks"] is None, i
+        elif not np.array_equal(pkt["landmarks"], wire.dequantize(enc.ref)):
+            raise AssertionError(f"frame {i}: receiver diverged after labels-only packets")
+    print("labels-only packets: receiver resyncs on the next keyframe")
@@ -0,0 +1,362 @@
+# evaluate.py
+"""
+Accuracy and detection latency of the pose rules plus the stabilizer on
+labelled traces, comparable across threshold configs.
+
+A labelled trace is a recording.py trace with a truth.u8 next to label.u8:
+the pose actually held in each frame, UNLABELLED where nobody annotated
+it (those frames are not scored). Write one from "start,end,label" rows,
+in seconds from the start of the trace, with
+
+  python evaluate.py session/ --annotate session.csv
+
+Every frame is reclassified with the compiled rules of each --rules config
+and voted on trace time by the stabilizer (MajorityVote: WINDOW frames,
+COOLDOWN debounce, unless --stabilizer etc. say otherwise). Per label:
+
+  P / R           per-frame precision and recall, of classify_pose ("raw")
+                  and of the stable gesture
+  detect          frames from the start of a truth segment to the gesture
+                  showing it; "missed" segments never showed it
+  release         frames from the end of a detected segment to the gesture
+                  letting go of it
+  false edges     `changed` edges to a label held neither in that truth
+                  segment nor the one before
+
+plus the truth x stable gesture confusion matrix, in frames. One job per
+(config, trace) runs on a process pool. -o writes the report as JSON and
+--compare prints the differences to an earlier one.
+
+  python evaluate.py traces/ --rules pose_rules.json loose.json -o new.json
+  python evaluate.py traces/ --compare base.json
+  python evaluate.py                          # synthetic labelled traces
+"""
+import os, sys, csv, json, time, argparse, platform, tempfile
+import multiprocessing as mp_proc
+import numpy as np
+import rules
+import stabilizer
+from bench import git_rev
+from poses import LABELS, LABEL_ID, POSE_LABELS, classify_batch, landmarks_from_array
+from recording import UNLABELLED, Trace, TraceWriter, write_truth
+
+N = len(LABELS)
+
+# ---------- one (config, trace) job ----------
+_rulesets = {}      # per worker process: config path -> rules.RuleSet
+
+def classify_trace(trace, classify):
+    """Per-frame label ids from classify(lms); 0 where not tracking."""
+    labels = np.zeros(len(trace), np.uint8)
+    for i in np.flatnonzero(trace.tracking):
+        labels[i] = LABEL_ID[classify(landmarks_from_array(trace.landmarks[i])) or ""]
+    return labels
+
+def stabilize(trace, labels, stab):
+    """Stable gesture id per frame and the frames carrying a changed edge."""
+    gesture = np.zeros(len(labels), np.uint8)
+    edges = []
+    times = trace.t.tolist()
+    for i, label_id in enumerate(labels.tolist()):
+        weight = stabilizer.confidence(trace.frame(i)) if stab.weighted else 1.0
+        g, changed = stab.update(LABELS[label_id], times[i], weight)
+        gesture[i] = LABEL_ID[g]
+        if changed:
+            edges.append(i)
+    return gesture, edges
+
+def segments(truth):
+    """(start, end, label id) for each run of equal truth ids."""
+    cuts = np.flatnonzero(np.diff(truth)) + 1
+    starts, ends = np.r_[0, cuts], np.r_[cuts, len(truth)]
+    return list(zip(starts.tolist(), ends.tolist(), truth[starts].tolist()))
+
+def score(truth, raw, gesture, edges):
+    """Counts for one trace, as plain lists/dicts so they pickle small and add up."""
+    scored = truth != UNLABELLED
+    conf_raw = np.zeros((N, N), np.int64)
+    conf = np.zeros((N, N), np.int64)
+    np.add.at(conf_raw, (truth[scored], raw[scored]), 1)
+    np.add.at(conf, (truth[scored], gesture[scored]), 1)
+
+    detect, release = {}, {}
+    missed, stuck, false_edges = {}, {}, {}
+    segs = segments(truth) if len(truth) else []
+    for start, end, label in segs:
+        if label in (0, UNLABELLED):
+            continue
+        hits = np.flatnonzero(gesture[start:end] == label)
+        if not len(hits):
+            missed[label] = missed.get(label, 0) + 1
+            continue
+        detect.setdefault(label, []).append(int(hits[0]))
+        if gesture[end - 1] != label or end == len(truth):
+            continue
+        gone = np.flatnonzero(gesture[end:] != label)
+        if len(gone):
+            release.setdefault(label, []).append(int(gone[0]))
+        else:
+            stuck[label] = stuck.get(label, 0) + 1      # still shown when the trace ends
+
+    seg_of = np.searchsorted([s for s, _, _ in segs], edges, side="right") - 1
+    for i, k in zip(edges, seg_of.tolist()):
+        g = int(gesture[i])
+        held = {segs[k][2]} | ({segs[k - 1][2]} if k > 0 else set())
+        if g and g not in held and UNLABELLED not in held:
+            false_edges[g] = false_edges.get(g, 0) + 1
+    return {"frames": int(scored.sum()), "confusion_raw": conf_raw.tolist(), "confusion": conf.tolist(),
+            "detect": detect, "release": release, "missed": missed, "stuck": stuck, "false_edges": false_edges}
+
+def run_job(job):
+    """Worker: score one trace under one rules config."""
+    config, path, stab_opts = job
+    rs = _rulesets.get(config)
+    if rs is None:
+        rs = _rulesets[config] = rules.RuleSet(config)
+    trace = Trace(path)
+    raw = classify_trace(trace, rs.classify)
+    gesture, edges = stabilize(trace, raw, stabilizer.make(**stab_opts))
+    result = score(trace.truth, raw, gesture, edges)
+    span = float(trace.t[-1] - trace.t[0]) if len(trace) > 1 else 0.0
+    result["fps"] = (len(trace) - 1) / span if span > 0 else 0.0
+    return config, path, result
+
+# ---------- aggregation ----------
+def merge(results):
+    """Add up per-trace score() dicts."""
+    total = {"traces": 0, "frames": 0, "confusion_raw": np.zeros((N, N), np.int64),
+             "confusion": np.zeros((N, N), np.int64), "detect": {}, "release": {}, "missed": {},
+             "stuck": {}, "false_edges": {}, "fps": []}
+    for r in results:
+        total["traces"] += 1
+        total["frames"] += r["frames"]
+        total["confusion_raw"] += r["confusion_raw"]
+        total["confusion"] += r["confusion"]
+        for key in ("detect", "release"):
+            for label, frames in r[key].items():
+                total[key].setdefault(label, []).extend(frames)
+        for key in ("missed", "stuck", "false_edges"):
+            for label, n in r[key].items():
+                total[key][label] = total[key].get(label, 0) + n
+        if r["fps"]:
+            total["fps"].append(r["fps"])
+    return total
+
+def _pr(conf, i):
+    tp = conf[i, i]
+    predicted, actual = conf[:, i].sum(), conf[i].sum()
+    return (round(float(tp / predicted), 4) if predicted else None), (round(float(tp / actual), 4) if actual else None)
+
+def _dist(frames):
+    if not frames:
+        return None
+    a = np.asarray(frames)
+    return {"n": len(a), "p50": float(np.percentile(a, 50)), "p90": float(np.percentile(a, 90)),
+            "max": int(a.max()), "mean": round(float(a.mean()), 2)}
+
+def summarize(total):
+    """JSON-ready report for one config."""
+    conf, conf_raw = total["confusion"], total["confusion_raw"]
+    labels = {}
+    for i, label in enumerate(LABELS):
+        if not label or not (conf[i].sum() or conf[:, i].sum() or conf_raw[:, i].sum()):
+            continue
+        p_raw, r_raw = _pr(conf_raw, i)
+        p, r = _pr(conf, i)
+        labels[label] = {"frames": int(conf[i].sum()), "raw_precision": p_raw, "raw_recall": r_raw,
+                         "precision": p, "recall": r, "detect": _dist(total["detect"].get(i, [])),
+                         "missed": total["missed"].get(i, 0), "release": _dist(total["release"].get(i, [])),
+                         "stuck": total["stuck"].get(i, 0), "false_edges": total["false_edges"].get(i, 0)}
+    return {"traces": total["traces"], "frames": total["frames"],
+            "fps": round(float(np.median(total["fps"])), 2) if total["fps"] else None,
+            "labels": labels, "confusion": conf.tolist(), "confusion_raw": conf_raw.tolist()}
+
+# ---------- printing ----------
+def _f(v, fmt="5.2f"):
+    return format(v, fmt) if v is not None else "-".rjust(int(fmt.split(".")[0]))
+
+def _d(d):
+    return f"{d['p50']:4.0f}/{d['p90']:4.0f}/{d['max']:4d}" if d else f"{'-':>14}"
+
+def print_report(name, rep):
+    print(f"\n== {name}: {rep['traces']} traces, {rep['frames']} scored frames, {_f(rep['fps'], '4.1f')} fps")
+    print(f"{'label':18} {'frames':>7} {'raw P':>5} {'raw R':>5} {'P':>5} {'R':>5}  "
+          f"{'detect p50/p90/max':>18} {'missed':>6}  {'release p50/p90/max':>19} {'stuck':>5} {'false':>5}")
+    for label, m in rep["labels"].items():
+        print(f"{label[:18]:18} {m['frames']:7d} {_f(m['raw_precision'])} {_f(m['raw_recall'])} "
+              f"{_f(m['precision'])} {_f(m['recall'])}  {_d(m['detect']):>18} {m['missed']:6d}  "
+              f"{_d(m['release']):>19} {m['stuck']:5d} {m['false_edges']:5d}")
+    conf = np.asarray(rep["confusion"])
+    ids = [i for i in range(N) if conf[i].sum() or conf[:, i].sum()]
+    print("confusion (frames; rows truth, columns stable gesture, by LABELS id):")
+    print(f"{'':22}" + "".join(f"{i:>7}" for i in ids))
+    for i in ids:
+        print(f"{i:2} {(LABELS[i] or '(none)')[:18]:18} " + "".join(f"{conf[i, j]:7d}" for j in ids))
+
+def compare(reports, base):
+    """Print per-label changes against an earlier report (same config file name, or the only one in each)."""
+    by_file = {os.path.basename(name): name for name in base}
+    pairs = [(name, by_file[os.path.basename(name)]) for name in reports if os.path.basename(name) in by_file]
+    if not pairs and len(reports) == 1 and len(base) == 1:
+        pairs = [(next(iter(reports)), next(iter(base)))]
+    for name, base_name in pairs:
+        print(f"\n{name} vs {base_name} (earlier report):")
+        print(f"  {'label':18} {'dP':>6} {'dR':>6} {'d detect p50':>12} {'d release p50':>13} {'d false':>7}")
+        old = base[base_name]["labels"]
+        for label, m in reports[name]["labels"].items():
+            o = old.get(label)
+            if o is None:
+                continue
+            delta = lambda a, b: f"{a - b:+6.2f}" if a is not None and b is not None else f"{'-':>6}"
+            p50 = lambda m, k: m[k]["p50"] if m[k] else None
+            print(f"  {label[:18]:18} {delta(m['precision'], o['precision'])} {delta(m['recall'], o['recall'])} "
+                  f"{delta(p50(m, 'detect'), p50(o, 'detect')):>12} {delta(p50(m, 'release'), p50(o, 'release')):>13} "
+                  f"{m['false_edges'] - o['false_edges']:+7d}")
+
+# ---------- inputs ----------
+def find_traces(paths):
+    """Trace directories under paths (a path may be a trace or contain traces at any depth)."""
+    found = []
+    for path in paths:
+        for root, dirs, files in os.walk(path):
+            if "t.f64" in files:
+                found.append(root)
+                dirs[:] = []
+            dirs.sort()
+    return found
+
+def annotate(path, csv_path):
+    """truth.u8 from "start,end,label" rows (seconds from the trace start); other frames stay unlabelled."""
+    trace = Trace(path)
+    t = np.asarray(trace.t) - (float(trace.t[0]) if len(trace) else 0.0)
+    truth = np.full(len(trace), UNLABELLED, np.uint8)
+    with open(csv_path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].lstrip().startswith("#") or row[0] == "start":
+                continue
+            start, end, label = float(row[0]), float(row[1]), row[2].strip()
+            if label not in LABEL_ID:
+                raise SystemExit(f"{csv_path}: unknown label {label!r}")
+            truth[(t >= start) & (t < end)] = LABEL_ID[label]
+    write_truth(path, truth)
+    return truth
+
+def synthetic_traces(root, count=8, frames=3000, fps=30.0, noise=0.004):
+    """
+    Labelled traces without a camera: random bodies that the default rules
+    put in each pose, held 1-4 s with per-frame jitter added. The truth is
+    the held pose, so everything the jitter flips shows up as errors.
+    """
+    rng = np.random.default_rng(0)
+    n = 200_000
+    bodies = np.empty((n, 33, 4), np.float32)
+    bodies[..., :2] = rng.uniform(0.3, 0.7, (n, 33, 2))
+    bodies[..., 2] = rng.uniform(-0.3, 0.3, (n, 33))
+    bodies[..., 3] = rng.uniform(0.3, 1.0, (n, 33))
+    ids = classify_batch(bodies)
+    held = [LABEL_ID[""]] + [LABEL_ID[l] for l in sorted(POSE_LABELS)]
+    by_label = {i: np.flatnonzero(ids == i) for i in held}
+    paths = []
+    for k in range(count):
+        path = os.path.join(root, f"synthetic{k}")
+        truth = []
+        with TraceWriter(path) as w:
+            t0 = time.time()
+            while len(truth) < frames:
+                label = held[rng.integers(len(held))]
+                body = bodies[rng.choice(by_label[label])]
+                for _ in range(int(rng.uniform(1, 4) * fps)):
+                    lm = body.copy()
+                    lm[:, :3] += rng.normal(0.0, noise, (33, 3))
+                    w.write(t0 + len(truth) / fps, lm, "")
+                    truth.append(label)
+        write_truth(path, truth)
+        paths.append(path)
+    return paths
+
+def main():
+    ap = argparse.ArgumentParser(description="Score pose rules + stabilizer on labelled traces.")
+    ap.add_argument("traces", nargs="*", help="trace directories, or directories to search for them "
+                                              "(default: synthetic labelled traces)")
+    ap.add_argument("--rules", nargs="+", default=[rules.DEFAULT_PATH], metavar="CONFIG",
+                    help="rules configs to compare (see rules.py)")
+    ap.add_argument("--stabilizer", choices=sorted(stabilizer.STRATEGIES), default="majority")
+    ap.add_argument("--window", type=int, help=f"frames to vote over (default {stabilizer.WINDOW})")
+    ap.add_argument("--window-ms", type=float)
+    ap.add_argument("--enter", type=float)
+    ap.add_argument("--exit", type=float)
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--annotate", metavar="CSV", help="write truth.u8 for the one trace given and exit")
+    ap.add_argument("-o", "--out", help="write the JSON report here")
+    ap.add_argument("--compare", help="earlier JSON report to compare against")
+    args = ap.parse_args()
+
+    if args.annotate:
+        if len(args.traces) != 1:
+            ap.error("--annotate takes exactly one trace")
+        truth = annotate(args.traces[0], args.annotate)
+        print(f"{args.traces[0]}: {int((truth != UNLABELLED).sum())} of {len(truth)} frames labelled")
+        return
+
+    tmp = None
+    if args.traces:
+        paths = find_traces(args.traces)
+        unlabelled = [p for p in paths if not os.path.exists(os.path.join(p, "truth.u8"))]
+        if unlabelled:
+            print(f"skipping {len(unlabelled)} traces without truth.u8 (see --annotate)", file=sys.stderr)
+        paths = [p for p in paths if p not in unlabelled]
+        if not paths:
+            raise SystemExit("no labelled traces found")
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        paths = synthetic_traces(tmp.name)
+        print(f"{len(paths)} synthetic labelled traces", file=sys.stderr)
+
+    if (args.enter is not None or args.exit is not None) and args.stabilizer != "hysteresis":
+        ap.error("--enter / --exit only apply to --stabilizer hysteresis")
+    if args.window_ms is not None and args.window_ms <= 0:
+        ap.error("--window-ms must be positive")
+    stab_opts = {"name": args.stabilizer, "window": args.window, "window_ms": args.window_ms}
+    if args.stabilizer == "hysteresis":
+        stab_opts.update(enter=args.enter, exit=args.exit)
+    for config in args.rules:
+        try:
+            rules.load_rules(config)        # fail here, not in every worker
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"{config}: {e}")
+    jobs = [(config, path, stab_opts) for config in args.rules for path in paths]
+    # Biggest traces first so the pool doesn't end on a straggler
+    jobs.sort(key=lambda j: os.path.getsize(os.path.join(j[1], "t.f64")), reverse=True)
+
+    results = {config: [] for config in args.rules}
+    t0 = time.perf_counter()
+    with mp_proc.Pool(min(args.workers, len(jobs))) as pool:
+        for done, (config, path, result) in enumerate(pool.imap_unordered(run_job, jobs), 1):
+            results[config].append(result)
+            print(f"\r{done}/{len(jobs)} jobs", end="", flush=True, file=sys.stderr)
+    print(f"\r{len(jobs)} jobs in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    if tmp is not None:
+        tmp.cleanup()
+
+    reports = {config: summarize(merge(r)) for config, r in results.items()}
+    for config, rep in reports.items():
+        print_report(config, rep)
+
+    if args.out:
+        report = {
+            "commit": git_rev(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "stabilizer": stab_opts,
+            "traces": paths if args.traces else "synthetic",
+            "configs": reports,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(reports, json.load(f)["configs"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# fanout.py
+"""
+Multi-subscriber UDP fan-out for main.py --serve PORT.
+
+Instead of sending to one hardcoded address, the sender listens on a
+control port. Clients send small JSON datagrams from the socket they want
+packets on:
+
+  {"op": "subscribe", "format": "json" | "binary", "rate": 30}
+      rate is the max packets/s for this client (0 = every frame); an
+      optional "port" sends data to that port on the client's host instead
+  {"op": "heartbeat"}        any datagram counts; silent clients expire
+  {"op": "unsubscribe"}
+
+and get {"op": "ack", ...} back. Each frame is encoded once per format
+that has subscribers, on the sender thread; the asyncio loop thread then
+sends that one buffer to every subscriber that is due. Frames carrying a
+`changed` edge go to everyone regardless of rate so no edge is skipped.
+Packets keep the sender's `seq`, so a rate-limited subscriber sees gaps
+for the frames it skipped; use schedule.Receiver(count_gaps=False) there.
+Delta streaming needs per-receiver state and is not offered here.
+
+`python fanout.py --clients 40` is a local load test.
+"""
+import json, math, time, socket, asyncio, threading
+
+EXPIRY = 5.0                # seconds without any datagram before a subscriber is dropped
+
+class Subscription:
+    __slots__ = ("addr", "fmt", "interval", "next_due", "last_seen", "sent")
+
+    def __init__(self, addr, fmt, rate):
+        self.addr = addr
+        self.fmt = fmt
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_due = 0.0
+        self.last_seen = time.monotonic()
+        self.sent = 0
+
+class _Control(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport):
+        self.server.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.server._control(data, addr)
+
+class FanoutServer:
+    def __init__(self, encoders, host="127.0.0.1", port=54550, expiry=EXPIRY, on_activity=None):
+        self.encoders = encoders        # format -> fn(sample, fps, gesture, changed, seq) -> bytes
+        self.on_activity = on_activity  # called for every subscriber datagram (control.py idle mode)
+        self.host = host
+        self.port = port
+        self.expiry = expiry
+        self.subs = {}                  # control addr -> Subscription
+        self.formats = frozenset()      # formats with subscribers; read by the sender thread
+        self.loop = None
+        self.transport = None
+
+    # ---------- sender thread ----------
+    def start(self):
+        """Run the asyncio loop on a daemon thread; returns once the control port is bound."""
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(self.loop.create_datagram_endpoint(
+                lambda: _Control(self), local_addr=(self.host, self.port)))
+            self.loop.create_task(self._expire())
+            ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, name="fanout", daemon=True).start()
+        ready.wait()
+        return self
+
+    def publish(self, s, fps, gesture, changed, seq):
+        """Encode the frame once per subscribed format and hand the buffers to the loop."""
+        formats = self.formats
+        if not formats:
+            return
+        bufs = {fmt: self.encoders[fmt](s, fps, gesture, changed, seq) for fmt in formats}
+        self.loop.call_soon_threadsafe(self._fanout, bufs, changed)
+
+    # ---------- loop thread ----------
+    def _fanout(self, bufs, changed):
+        now = time.monotonic()
+        sendto = self.transport.sendto
+        for sub in self.subs.values():
+            buf = bufs.get(sub.fmt)
+            if buf is None or (now < sub.next_due and not changed):
+                continue
+            sendto(buf, sub.addr)
+            sub.sent += 1
+            sub.next_due = max(sub.next_due + sub.interval, now) if sub.interval else 0.0
+
+    def _control(self, data, addr):
+        try:
+            msg = json.loads(data)
+            op = msg.get("op", "heartbeat")
+        except (ValueError, AttributeError):
+            return
+        sub = self.subs.get(addr)
+        if op == "subscribe":
+            fmt = msg.get("format", "json")
+            if fmt not in self.encoders:
+                self._reply(addr, {"op": "error", "error": f"unknown format {fmt!r}",
+                                   "formats": sorted(self.encoders)})
+                return
+            port, rate = msg.get("port", addr[1]), msg.get("rate", 0)
+            if not _is_number(port) or not 0 < port < 65536 or port != int(port):
+                self._reply(addr, {"op": "error", "error": f"port must be 1-65535, not {port!r}"})
+                return
+            if not _is_number(rate) or not 0 <= rate < math.inf:
+                self._reply(addr, {"op": "error", "error": f"rate must be a finite number >= 0, not {rate!r}"})
+                return
+            self.subs[addr] = sub = Subscription((addr[0], int(port)), fmt, float(rate))
+            self._update_formats()
+        elif op == "unsubscribe":
+            if self.subs.pop(addr, None) is not None:
+                self._update_formats()
+            self._reply(addr, {"op": "ack", "subscribed": False})
+            return
+        elif sub is None:
+            self._reply(addr, {"op": "error", "error": "not subscribed"})
+            return
+        sub.last_seen = time.monotonic()
+        if self.on_activity is not None:
+            self.on_activity()
+        self._reply(addr, {"op": "ack", "subscribed": True, "format": sub.fmt, "expiry": self.expiry})
+
+    def _reply(self, addr, msg):
+        self.transport.sendto(json.dumps(msg, separators=(",",":")).encode("utf-8"), addr)
+
+    def _update_formats(self):
+        self.formats = frozenset(sub.fmt for sub in self.subs.values())
+
+    async def _expire(self):
+        while True:
+            await asyncio.sleep(self.expiry / 4)
+            cutoff = time.monotonic() - self.expiry
+            dead = [addr for addr, sub in self.subs.items() if sub.last_seen < cutoff]
+            for addr in dead:
+                del self.subs[addr]
+            if dead:
+                self._update_formats()
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+class Subscriber:
+    """Minimal Python client: subscribes, heartbeats in the background, recv() returns packets."""
+    def __init__(self, server=("127.0.0.1", 54550), fmt="json", rate=0, heartbeat=1.0):
+        self.server = server
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self._send({"op": "subscribe", "format": fmt, "rate": rate})
+        self._stop = threading.Event()
+
+        def beat():
+            while not self._stop.wait(heartbeat):
+                self._send({"op": "heartbeat"})
+
+        threading.Thread(target=beat, name="heartbeat", daemon=True).start()
+
+    def _send(self, msg):
+        self.sock.sendto(json.dumps(msg).encode("utf-8"), self.server)
+
+    def recv(self, bufsize=65535):
+        """Next data packet (acks are skipped)."""
+        while True:
+            buf = self.sock.recv(bufsize)
+            if not buf.startswith(b'{"op"'):
+                return buf
+
+    def close(self):
+        self._stop.set()
+        self._send({"op": "unsubscribe"})
+        self.sock.close()
+
+if __name__ == "__main__":
+    import argparse, types
+    ap = argparse.ArgumentParser(description="Fan-out load test with synthetic frames.")
+    ap.add_argument("--clients", type=int, default=40)
+    ap.add_argument("--fps", type=float, default=60.0)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--port", type=int, default=54599)
+    args = ap.parse_args()
+
+    encoders = {
+        "json": lambda s, fps, g, c, seq: json.dumps({"seq": seq, "gesture": g, "changed": c,
+                                                      "pad": "x" * 1800}).encode("utf-8"),
+        "binary": lambda s, fps, g, c, seq: seq.to_bytes(4, "little") + bytes(259),
+    }
+    server = FanoutServer(encoders, port=args.port).start()
+    clients = [Subscriber(("127.0.0.1", args.port), ("json", "binary")[i % 2], rate=(0, 10)[i % 3 == 2])
+               for i in range(args.clients)]
+    got = [0] * len(clients)
+    stop = threading.Event()
+
+    def drain():
+        import selectors
+        sel = selectors.DefaultSelector()
+        for i, c in enumerate(clients):
+            sel.register(c.sock, selectors.EVENT_READ, i)
+        while not stop.is_set():
+            for key, _ in sel.select(0.05):
+                if not key.fileobj.recv(65535).startswith(b'{"op"'):
+                    got[key.data] += 1
+
+    threading.Thread(target=drain, daemon=True).start()
+    time.sleep(0.2)
+
+    frames, publish_s = 0, 0.0
+    t_end = time.monotonic() + args.seconds
+    while time.monotonic() < t_end:
+        t0 = time.perf_counter()
+        server.publish(types.SimpleNamespace(), args.fps, "", frames % 90 == 0, frames)
+        publish_s += time.perf_counter() - t0
+        frames += 1
+        time.sleep(1.0 / args.fps)
+    time.sleep(0.2)
+    stop.set()
+
+    full = [g for i, g in enumerate(got) if i % 3 != 2]
+    slow = [g for i, g in enumerate(got) if i % 3 == 2]
+    print(f"{frames} frames at {args.fps:.0f} fps to {len(server.subs)} subscribers; "
+          f"publish {publish_s / frames * 1e6:.0f} us/frame on the sender thread")
+    print(f"full-rate clients got {min(full)}-{max(full)} packets, 10 Hz clients {min(slow)}-{max(slow)}")
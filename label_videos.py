@@ -0,0 +1,131 @@
+# label_videos.py
+"""
+Label recorded videos offline with the same classify_pose rules and
+WINDOW/COOLDOWN stabilizer used live, spread over all cores.
+
+Each video is cut into chunks of --chunk frames; every worker process owns
+one mp_pose.Pose and labels whole chunks. Per-frame labels are stitched
+back together in order, then the stable `gesture`/`changed` timeline is
+rebuilt with stabilizer.MajorityVote on video time, and everything lands
+in one CSV:
+
+  video,frame,t,label,gesture,changed
+
+  python label_videos.py game1.mp4 game2.mp4 -o labels.csv --workers 8
+"""
+import os, csv, time, argparse
+import multiprocessing as mp_proc
+import numpy as np
+import cv2
+import mediapipe as mp
+from poses import classify_pose, mirror_landmarks, LABELS, LABEL_ID
+from stabilizer import MajorityVote
+
+mp_pose = mp.solutions.pose
+
+_pose = None
+_mirror = True
+
+def _init_worker(model_complexity, mirror):
+    global _pose, _mirror
+    cv2.setNumThreads(1)    # one process per core; don't oversubscribe
+    _pose = mp_pose.Pose(model_complexity=model_complexity, enable_segmentation=False)
+    _mirror = mirror
+
+def label_chunk(job):
+    """Worker: returns (video, start, labels) for frames [start, end)."""
+    video, start, end = job
+    cap = cv2.VideoCapture(video)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    labels = np.zeros(end - start, np.uint8)
+    n = 0
+    frame = rgb = None      # reused for the whole chunk
+    while n < len(labels):
+        ok, frame = cap.read(frame)
+        if not ok:
+            break
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        results = _pose.process(rgb)
+        if results.pose_landmarks is not None:
+            if _mirror:
+                mirror_landmarks(results.pose_landmarks.landmark)   # same orientation as the live sender
+            labels[n] = LABEL_ID[classify_pose(results.pose_landmarks.landmark) or ""]
+        n += 1
+    cap.release()
+    return video, start, labels[:n]
+
+def plan(videos, chunk):
+    """Split every video into [start, end) frame ranges; also returns each video's fps."""
+    jobs, fps = [], {}
+    for video in videos:
+        cap = cv2.VideoCapture(video)
+        if not cap.isOpened():
+            raise SystemExit(f"could not open {video}")
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps[video] = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        jobs += [(video, s, min(s + chunk, frames)) for s in range(0, frames, chunk)]
+    return jobs, fps
+
+def pad_chunks(video, parts):
+    """
+    Per-chunk labels, each but the last padded to where the next chunk
+    starts. FRAME_COUNT is an estimate and POS_FRAMES seeks are inexact for
+    many codecs, so a chunk can come back short; padding with "" keeps the
+    frame numbers and times of every later row right.
+    """
+    out = []
+    for (start, labels), (end, _) in zip(parts, parts[1:]):
+        if len(labels) < end - start:
+            print(f"\n{video}: frames {start + len(labels)}-{end - 1} could not be read; labelled \"\"")
+            labels = np.concatenate([labels, np.zeros(end - start - len(labels), np.uint8)])
+        out.append(labels)
+    out.append(parts[-1][1])
+    return out
+
+def stabilize(labels, fps):
+    """Rebuild gesture/changed exactly as main.py would, on video time."""
+    voter = MajorityVote()
+    for i, label_id in enumerate(labels):
+        yield voter.update(LABELS[label_id], now=i / fps)
+
+def main():
+    ap = argparse.ArgumentParser(description="Label videos with classify_pose on a process pool.")
+    ap.add_argument("videos", nargs="+")
+    ap.add_argument("-o", "--out", default="labels.csv")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--chunk", type=int, default=600, help="frames per work item")
+    ap.add_argument("--model-complexity", type=int, default=0, choices=(0, 1, 2))
+    ap.add_argument("--no-mirror", action="store_true", help="don't mirror landmarks like the live camera path")
+    args = ap.parse_args()
+
+    jobs, fps = plan(args.videos, args.chunk)
+    # Longest chunks first so the pool doesn't end on a straggler
+    jobs.sort(key=lambda j: j[2] - j[1], reverse=True)
+
+    chunks = {v: [] for v in args.videos}
+    t0 = time.perf_counter()
+    done = 0
+    with mp_proc.Pool(args.workers, _init_worker, (args.model_complexity, not args.no_mirror)) as pool:
+        for video, start, labels in pool.imap_unordered(label_chunk, jobs):
+            chunks[video].append((start, labels))
+            done += len(labels)
+            rate = done / (time.perf_counter() - t0)
+            print(f"\r{done} frames, {rate:.1f} frames/s", end="", flush=True)
+    secs = time.perf_counter() - t0
+    print()
+
+    with open(args.out, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(("video", "frame", "t", "label", "gesture", "changed"))
+        for video in args.videos:
+            parts = sorted(chunks[video], key=lambda c: c[0])
+            labels = np.concatenate(pad_chunks(video, parts)) if parts else np.zeros(0, np.uint8)
+            for i, (label_id, (gesture, changed)) in enumerate(zip(labels, stabilize(labels, fps[video]))):
+                w.writerow((video, i, round(i / fps[video], 4), LABELS[label_id], gesture, int(changed)))
+
+    print(f"{done} frames in {secs:.1f}s with {args.workers} workers: "
+          f"{done / max(secs, 1e-9):.1f} frames/s -> {args.out}")
+
+if __name__ == "__main__":
+    main()
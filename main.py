@@ -1,31 +1,123 @@
 # main.py
-import socket, json, time, cv2
-import mediapipe as mp
-from collections import deque, Counter
-from poses import classify_pose  # <-- new
+import time
+T_START = time.perf_counter()       # before the imports below, so startup timing includes them
+import sys, socket, json, types, threading, argparse, functools, cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from poses import classify_pose, landmarks_to_array, mirror_landmarks
+import wire
+from delta import DeltaEncoder
+from recording import TraceWriter
+from stats import StageStats, start_datagrams, start_http
+import stabilizer
+import smoothing
+import rules
+from fanout import FanoutServer
+from adaptive import AdaptiveInference
+from motion import MotionGestures
+from schedule import Edges, SendScheduler
+from control import Control, serve as serve_control
 
 ADDR = ("127.0.0.1", 54545)
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(model_complexity=0, enable_segmentation=False)
+# --- Stability state: see stabilizer.py (WINDOW frames, COOLDOWN debounce) ---
 
-# Prefer V4L2 on Linux; fall back if needed
-cap = cv2.VideoCapture(0, cv2.CAP_V4L2)
-if not cap.isOpened():
-    cap = cv2.VideoCapture(0, cv2.CAP_ANY)
+def open_camera(index=0, width=640, height=480):
+    # V4L2 first on Linux (elsewhere it can only fail); fall back to any backend.
+    # The resolution goes to the constructor: set() after opening makes V4L2
+    # stop and reinitialise the device, which costs a good part of a second.
+    apis = (cv2.CAP_V4L2, cv2.CAP_ANY) if sys.platform.startswith("linux") else (cv2.CAP_ANY,)
+    size = [cv2.CAP_PROP_FRAME_WIDTH, width, cv2.CAP_PROP_FRAME_HEIGHT, height]
+    for api in apis:
+        cap = cv2.VideoCapture(index, api, size)
+        if not cap.isOpened():
+            # backends that refuse open-time parameters
+            cap = cv2.VideoCapture(index, api)
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if cap.isOpened():
+            break
+    # Keep the driver queue short so we never read a stale frame
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
 
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+def ms_since(t0):
+    return round((time.perf_counter() - t0) * 1000.0, 2)
 
-# --- Stability state ---
-WINDOW = 10                 # frames to vote over
-COOLDOWN = 0.25             # seconds min between changes (debounce)
-hist = deque(maxlen=WINDOW)
-last_stable = ""
-last_change = 0.0
+class Sample:
+    """One camera frame as it moves through the capture -> inference -> send stages."""
+    __slots__ = ("frame", "t_cap", "t_queued", "results", "label", "lat", "held", "player", "event", "labels_only",
+                 "_lm")
 
-def to_packet(results, fps, gestures_raw, gesture, changed, tracking):
+    def __init__(self, frame, t_cap):
+        self.frame = frame
+        self.t_cap = t_cap              # wall clock when cap.read() returned
+        self.t_queued = time.perf_counter()
+        self.results = None
+        self.label = ""
+        self.lat = {}                   # per-stage milliseconds
+        self.held = False               # results repeated from an earlier frame (adaptive.py)
+        self.player = 0                 # source id when multicam.py runs several cameras
+        self.event = 0                  # id of the latest gesture change, set by Sender (schedule.py)
+        self.labels_only = False        # send the label without landmarks (control.py throttle)
+        self._lm = None
+
+    def landmarks(self):
+        """(33, 4) array of the pose landmarks, or None when not tracking; computed once."""
+        if self._lm is None and self.results.pose_landmarks is not None:
+            self._lm = landmarks_to_array(self.results.pose_landmarks.landmark)
+        return self._lm
+
+class FramePool:
+    """
+    Camera frame buffers reused across frames so cap.read() doesn't allocate
+    ~900 KB each time. get() returns a free buffer (None while the pool is
+    still growing, which makes cap.read() allocate one); release() hands a
+    frame back once pose.process has copied it.
+    """
+    def __init__(self):
+        self._free = []             # list.append/pop are atomic; no lock needed
+
+    def get(self):
+        return self._free.pop() if self._free else None
+
+    def release(self, frame):
+        if frame is not None:
+            self._free.append(frame)
+
+class LatestSlot:
+    """Bounded single-slot buffer: put() overwrites, get() takes the newest item."""
+    def __init__(self, on_drop=None):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.on_drop = on_drop      # called with each overwritten item
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(self._item)
+            self._item = item
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Block until an item is available; returns None once closed and drained, or after timeout seconds."""
+        with self._cond:
+            if self._item is None and not self._closed:
+                self._cond.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+def to_packet(results, fps, gestures_raw, gesture, changed, tracking, t_cap=None, lat=None, held=False,
+              player=0, seq=None, event=0):
     lm = []
     if results.pose_landmarks:
         for i, p in enumerate(results.pose_landmarks.landmark):
@@ -36,62 +128,454 @@ def to_packet(results, fps, gestures_raw, gesture, changed, tracking):
                 "z": round(float(getattr(p, "z", 0.0)), 3),
                 "v": round(float(getattr(p, "visibility", 0.0)), 3)
             })
+    t = time.time()
     return {
-        "t": time.time(),
+        "seq": seq,                    # per sender (player); gaps mean lost packets, except for
+                                       # rate-limited --serve subscribers, which skip frames
+        "t": t,
+        "t_cap": t if t_cap is None else t_cap,  # wall clock of the camera frame
         "fps": round(fps, 2),
         "tracking": tracking,          # True if landmarks present
         "landmarks": lm,               # raw landmarks (optional in Godot)
         "gestures_raw": gestures_raw,  # per-frame label list (single)
         "gesture": gesture,            # stable label or ""
-        "changed": changed             # True only on edge
+        "changed": changed,            # True on edge (and the --repeat-edges packets after it)
+        "event": event,                # id of the latest change; act on each id once
+        "held": held,                  # landmarks repeated, inference skipped
+        "player": player,              # camera / player id (multicam.py)
+        "lat": lat or {}               # per-stage latency in ms
     }
 
-prev = time.time()
-while True:
-    ok, frame = cap.read()
+def read_frame(cap, pool=None):
+    t0 = time.perf_counter()
+    ok, frame = cap.read(pool.get() if pool is not None else None)
     if not ok:
-        break
-
-    frame = cv2.flip(frame, 1)
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(rgb)
-
-    # Per-frame label from your new classifier
-    tracking = results.pose_landmarks is not None
-    label_now = ""
-    if tracking:
-        label_now = classify_pose(results.pose_landmarks.landmark) or ""
-    gestures_raw = [label_now] if label_now else []
-
-    # Append single label (or "") into voting window
-    hist.append(label_now)
-
-    # Majority vote on non-empty
-    gesture = last_stable
-    changed = False
-    if len(hist) == hist.maxlen:
-        nonempty = [g for g in hist if g]
-        voted = Counter(nonempty).most_common(1)[0][0] if nonempty else ""
+        return None
+    s = Sample(frame, time.time())
+    s.lat["read"] = ms_since(t0)
+    return s
+
+def infer(pose, s, rgb=None, smoother=None):
+    """
+    Pose + classify one Sample. rgb is a buffer to convert into; returns the
+    one used. smoother (smoothing.py) filters the landmarks before they are
+    classified and sent.
+    """
+    lat, clock = s.lat, time.perf_counter
+    t0 = clock()
+    rgb = cv2.cvtColor(s.frame, cv2.COLOR_BGR2RGB, dst=rgb)
+    t1 = clock(); lat["cvtColor"] = round((t1 - t0) * 1000.0, 2)
+    s.results = pose.process(rgb)
+    t2 = clock(); lat["process"] = round((t2 - t1) * 1000.0, 2)
+
+    if s.results.pose_landmarks is not None:
+        lms = s.results.pose_landmarks.landmark
+        mirror_landmarks(lms)   # instead of cv2.flip on the frame; see poses.py
+        t3 = clock(); lat["mirror"] = round((t3 - t2) * 1000.0, 2)
+        if smoother is not None:
+            smoother.apply(lms, s.t_cap)
+            t4 = clock(); lat["smooth"] = round((t4 - t3) * 1000.0, 2); t3 = t4
+        # Per-frame label from your new classifier
+        s.label = classify_pose(lms) or ""
+        lat["classify"] = ms_since(t3)
+    elif smoother is not None:
+        smoother.reset()
+    return rgb
+
+def make_step(pose, smoother=None):
+    """infer() bound to pose, reusing one RGB buffer (call from a single thread)."""
+    rgb = None
+
+    def step(s):
+        nonlocal rgb
+        rgb = infer(pose, s, rgb, smoother)
+    return step
+
+NO_LANDMARKS = types.SimpleNamespace(pose_landmarks=None)
+
+def sent_landmarks(s):
+    """(landmarks to send or None, wire flags) for a Sample; labels_only keeps TRACKING but drops the body."""
+    flags = wire.HELD if s.held else 0
+    if s.labels_only and s.results.pose_landmarks is not None:
+        return None, flags | wire.TRACKING
+    return s.landmarks(), flags
+
+def encode_json(s, fps, gesture, changed, seq):
+    tracking = s.results.pose_landmarks is not None
+    gestures_raw = [s.label] if s.label else []
+    results = NO_LANDMARKS if s.labels_only else s.results
+    pkt = to_packet(results, fps, gestures_raw, gesture, changed, tracking, s.t_cap, s.lat, s.held, s.player,
+                    seq, s.event)
+    return json.dumps(pkt, separators=(",",":"), allow_nan=False).encode("utf-8")
+
+def encode_binary(s, fps, gesture, changed, seq):
+    lm, flags = sent_landmarks(s)
+    return wire.encode(lm, seq, time.time(), s.t_cap, fps, gesture, changed, s.label, flags, s.player, s.event)
+
+def encode_delta(enc, s, fps, gesture, changed, seq):
+    lm, flags = sent_landmarks(s)
+    return enc.encode(lm, seq, time.time(), s.t_cap, fps, gesture, changed, s.label, flags, s.player, s.event)
+
+FORMATS = ("json", "binary", "delta")
+
+class Sender:
+    """
+    Final stage: vote, encode and send one Sample per call, or with `rate`
+    vote on every call and send the newest state rate times a second.
+    """
+    def __init__(self, sock, addr, fmt="json", delta=None, recorder=None, stats=None, stab=None,
+                 fanout=None, ring=None, motion=None, rate=None, repeat=0):
+        self.sock = sock
+        self.addr = addr
+        self.fanout = fanout            # optional fanout.FanoutServer; replaces sock/addr
+        self.ring = ring                # optional shmring.RingWriter; replaces sock/addr
+        self.recorder = recorder        # optional recording.TraceWriter
+        self.motion = motion            # optional motion.MotionGestures
+        self.stats = stats              # optional stats.StageStats
+        if fmt == "delta":
+            self.encode = functools.partial(encode_delta, delta or DeltaEncoder())
+        else:
+            self.encode = encode_binary if fmt == "binary" else encode_json
+        self.stab = stab or stabilizer.MajorityVote()
+        self.edges = Edges(repeat)
+        self.scheduler = SendScheduler(self._send, rate).start() if rate else None
+        self.seq = 0
+        self.prev = time.time()
+        self.on_first = None            # fn() called once the first packet is out (Startup.first_packet)
+        self.viewer = None              # optional viewer.Viewer, shown every vote
+
+    def emit(self, s, now=None, vote=None):
+        """
+        now overrides the voting clock (replay); fps always uses wall time.
+        vote is a (gesture, changed) already decided elsewhere (multicam.py workers),
+        including any motion events.
+        """
+        if vote is None:
+            weight = stabilizer.confidence(s.landmarks()) if self.stab.weighted else 1.0
+            gesture, changed = self.stab.update(s.label, now, weight)
+            if self.motion is not None:
+                gesture, changed = self.motion.merge(s.landmarks(), s.t_cap, gesture, changed)
+        else:
+            gesture, changed = vote
+        if self.viewer is not None:
+            self.viewer.voted(s, gesture, self.stab.state())
+        if self.recorder is not None:
+            self.recorder.write(s.t_cap, s.landmarks(), s.label)
+        if self.scheduler is not None:
+            self.scheduler.offer(s, gesture, changed)
+        else:
+            self._send(s, gesture, changed)
+
+    def _send(self, s, gesture, changed):
         now = time.time()
-        if voted != last_stable and (now - last_change) >= COOLDOWN:
-            last_stable = voted
-            last_change = now
-            gesture = voted
-            changed = True
+        fps = 1.0 / max(1e-6, (now - self.prev)); self.prev = now
+        changed, s.event = self.edges.mark(changed)
+
+        s.lat["total"] = round((now - s.t_cap) * 1000.0, 2)
+        t0 = time.perf_counter()
+        if self.ring is not None:
+            self.ring.publish(s, fps, gesture, changed, self.seq)
+            t1 = time.perf_counter()
+        elif self.fanout is not None:
+            # Encodes once per subscribed format; sending happens on the fan-out thread
+            self.fanout.publish(s, fps, gesture, changed, self.seq)
+            t1 = time.perf_counter()
+        else:
+            buf = self.encode(s, fps, gesture, changed, self.seq)
+            t1 = time.perf_counter()
+            self.sock.sendto(buf, self.addr)
+        self.seq += 1
+        if self.on_first is not None:
+            self.on_first()
+            self.on_first = None
+
+        if self.stats is not None:
+            # Too late for this packet's "lat"; these only go to the stats endpoint
+            s.lat["encode"] = round((t1 - t0) * 1000.0, 2)
+            s.lat["send"] = ms_since(t1)
+            self.stats.record(s.lat)
+
+    def close(self):
+        """Send what the scheduler still holds and stop its thread."""
+        if self.scheduler is not None:
+            self.scheduler.stop()
+
+WARM_FRAME = (480, 640, 3)
+
+def make_pose(complexity=0):
+    """
+    mp_pose.Pose, warmed up on a blank frame: the first process() call sets
+    up the graph's buffers and interpreters, which would otherwise land on
+    the first camera frame. mediapipe is imported here, not at the top, so
+    the import can overlap opening the camera (see Startup).
+    """
+    import mediapipe as mp
+    pose = mp.solutions.pose.Pose(model_complexity=complexity, enable_segmentation=False)
+    pose.process(np.zeros(WARM_FRAME, dtype=np.uint8))
+    return pose
+
+def make_inference(complexity=0, adaptive=False, target_fps=None, smooth=None):
+    """Returns (step, AdaptiveInference or None) for the options main() takes."""
+    smoother = smoothing.make(smooth)
+    if adaptive or target_fps:
+        ai = AdaptiveInference(make_pose, complexity, roi=adaptive, gate=adaptive, target_fps=target_fps,
+                               smoother=smoother)
+        return ai.infer, ai
+    return make_step(make_pose(complexity), smoother), None
+
+def make_stabilizer(args):
+    """The --stabilizer strategy; --smooth allows a shorter default window."""
+    window = args.window or (smoothing.SMOOTHED_WINDOW if args.smooth != "none" else None)
+    kw = {"enter": args.enter, "exit": args.exit} if args.stabilizer == "hysteresis" else {}
+    return stabilizer.make(args.stabilizer, window=window, window_ms=args.window_ms, **kw)
+
+class Startup:
+    """
+    Milliseconds from process start (T_START, just before the imports) to
+    each startup step and to the first packet; printed once that is out and
+    listed under --stats-http as "startup".
+    """
+    def __init__(self, t0=T_START):
+        self.t0 = t0
+        self.marks = {}
+
+    def mark(self, name):
+        self.marks[name] = round((time.perf_counter() - self.t0) * 1000.0, 1)
+
+    def first_packet(self, name="first_packet"):
+        if name not in self.marks:
+            self.mark(name)
+            print("startup: " + ", ".join(f"{k} {ms:.0f} ms" for k, ms in self.marks.items()))
+
+def hand_off(s, pool, viewer=None):
+    """After inference: the frame goes to the viewer (which returns it to the pool) or straight back."""
+    if viewer is not None:
+        viewer.offer(s, pool.release)
+    else:
+        pool.release(s.frame)
+    s.frame = None
+
+def run_serial(cap, step, sender, control=None, viewer=None):
+    """
+    step(s) is the inference stage: make_step(pose) or AdaptiveInference.infer.
+    control (control.py) can pause, throttle or idle the loop before each read;
+    viewer (viewer.py) gets each frame once inference is done with it.
+    """
+    pool = FramePool()
+    while True:
+        if control is not None:
+            cap = control.gate(cap)
+        s = read_frame(cap, pool)
+        if s is None:
+            break
+        step(s)
+        hand_off(s, pool, viewer)
+        if control is not None:
+            s.labels_only = not control.landmarks
+        sender.emit(s)
+        if control is not None:
+            control.sent()
+
+def run_pipelined(cap, step, sender, control=None, viewer=None):
+    """Capture, inference and send on separate threads, always working on the newest frame."""
+    pool = FramePool()
+    captured, inferred = LatestSlot(lambda s: pool.release(s.frame)), LatestSlot()
+
+    def capture_loop():
+        nonlocal cap
+        while True:
+            if control is not None:
+                cap = control.gate(cap)
+            s = read_frame(cap, pool)
+            if s is None:
+                break
+            if control is not None:
+                s.labels_only = not control.landmarks
+            captured.put(s)
+        captured.close()
+
+    def infer_loop():
+        while True:
+            s = captured.get()
+            if s is None:
+                break
+            s.lat["q_infer"] = ms_since(s.t_queued)
+            step(s)
+            hand_off(s, pool, viewer)
+            s.t_queued = time.perf_counter()
+            inferred.put(s)
+        inferred.close()
+
+    threading.Thread(target=capture_loop, name="capture", daemon=True).start()
+    threading.Thread(target=infer_loop, name="infer", daemon=True).start()
+
+    try:
+        while True:
+            s = inferred.get()
+            if s is None:
+                break
+            s.lat["q_send"] = ms_since(s.t_queued)
+            sender.emit(s)
+            if control is not None:
+                control.sent()
+    finally:
+        print(f"dropped frames: capture->infer {captured.dropped}, infer->send {inferred.dropped}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Stream MediaPipe pose labels to Godot over UDP.")
+    ap.add_argument("--camera", type=int, default=0, help="camera index")
+    ap.add_argument("--source", action="append", metavar="CAMERA|VIDEO",
+                    help="run this camera index or video file in its own worker process; repeat for "
+                         "more players (see multicam.py)")
+    ap.add_argument("--host", default=ADDR[0])
+    ap.add_argument("--port", type=int, default=ADDR[1])
+    ap.add_argument("--pipeline", action="store_true",
+                    help="run capture, inference and send as separate threads (latest-frame semantics)")
+    ap.add_argument("--format", choices=FORMATS, default="json",
+                    help="packet format; see wire.py for the binary layout and delta.py for delta streaming")
+    ap.add_argument("--keyframe-every", type=int, default=30, help="delta format: frames between keyframes")
+    ap.add_argument("--delta-eps", type=float, default=0.004,
+                    help="delta format: min landmark movement (normalized units) worth resending")
+    ap.add_argument("--serve", type=int, metavar="PORT",
+                    help="fan out to subscribers that register on this control port (see fanout.py) "
+                         "instead of sending to host:port")
+    ap.add_argument("--shm", nargs="?", const="", metavar="PATH",
+                    help="write records to a shared-memory ring for consumers on this machine instead of "
+                         "sending UDP (default path: shmring.DEFAULT_PATH; see shmring.py)")
+    ap.add_argument("--send-rate", type=float, metavar="HZ",
+                    help="send the newest state at this rate instead of once per camera frame (see schedule.py)")
+    ap.add_argument("--repeat-edges", type=int, default=0, metavar="N",
+                    help="repeat each gesture change in the next N packets under the same event id")
+    ap.add_argument("--control", type=int, metavar="PORT",
+                    help="accept pause / resume / throttle datagrams on this port (see control.py)")
+    ap.add_argument("--idle-after", type=float, metavar="SECS",
+                    help="stop inferring while no consumer has sent a datagram for this long")
+    ap.add_argument("--idle-release", action="store_true",
+                    help="release the camera while paused or idle instead of leaving it open")
+    ap.add_argument("--rules", default=rules.DEFAULT_PATH,
+                    help="pose rules config; edits are picked up while running (see rules.py)")
+    ap.add_argument("--model-complexity", type=int, default=0, choices=(0, 1, 2))
+    ap.add_argument("--adaptive", action="store_true",
+                    help="crop to the player, downsample and skip inference on still frames (see adaptive.py)")
+    ap.add_argument("--target-fps", type=float,
+                    help="switch model_complexity up or down to hold this inference rate")
+    ap.add_argument("--view", action="store_true",
+                    help="show frames, landmarks, stage timings and stabilizer votes in a window drawn on its "
+                         "own thread (see viewer.py)")
+    ap.add_argument("--record", metavar="DIR", help="also record landmarks and labels to a trace directory")
+    ap.add_argument("--motion", action="store_true",
+                    help="also detect wave, swipe, jump and clap and send them as gestures (see motion.py)")
+    ap.add_argument("--stabilizer", choices=sorted(stabilizer.STRATEGIES), default="majority",
+                    help="how per-frame labels become the stable gesture; see stabilizer.py")
+    ap.add_argument("--smooth", choices=("none",) + tuple(smoothing.FILTERS), default="none",
+                    help="filter landmark jitter before classifying and sending (see smoothing.py)")
+    ap.add_argument("--window", type=int,
+                    help=f"frames to vote over (default {stabilizer.WINDOW}, {smoothing.SMOOTHED_WINDOW} with --smooth)")
+    ap.add_argument("--window-ms", type=float, help="vote over a time window instead of the last N frames")
+    ap.add_argument("--enter", type=float, help="hysteresis: window share needed to enter a gesture")
+    ap.add_argument("--exit", type=float, help="hysteresis: window share below which a gesture is released")
+    ap.add_argument("--stats-port", type=int, help="send per-stage timing stats as JSON datagrams to host:PORT")
+    ap.add_argument("--stats-http", type=int, metavar="PORT", help="serve per-stage timing stats on 127.0.0.1:PORT")
+    ap.add_argument("--stats-interval", type=float, default=1.0, help="seconds between stats datagrams")
+    args = ap.parse_args()
+    if args.source and (args.control or args.idle_after or args.view):
+        ap.error("--control / --idle-after / --view work with a single --camera, not --source")
+    if args.idle_after and not (args.control or args.serve):
+        ap.error("--idle-after needs --control or --serve so consumers have somewhere to send heartbeats")
+    if (args.enter is not None or args.exit is not None) and args.stabilizer != "hysteresis":
+        ap.error("--enter / --exit only apply to --stabilizer hysteresis")
+    if args.window_ms is not None and args.window_ms <= 0:
+        ap.error("--window-ms must be positive")
+
+    startup = Startup()
+    startup.mark("imports")
+    # The model (mediapipe import, graph setup, warm-up) builds on a thread
+    # while the rest of the setup runs and the camera opens
+    model = None
+    if not args.source:
+        builder = ThreadPoolExecutor(1, thread_name_prefix="model")
+        model = builder.submit(make_inference, args.model_complexity, args.adaptive, args.target_fps, args.smooth)
+        builder.shutdown(wait=False)
+    rules.default().load(args.rules)
+    rules.default().watch()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    stats = None
+    if args.stats_port or args.stats_http:
+        stats = StageStats()
+        if args.stats_port:
+            start_datagrams(stats, (args.host, args.stats_port), args.stats_interval)
+        if args.stats_http:
+            start_http(stats, args.stats_http)
+        stats.add_counters("startup", startup.marks)
+    control = None
+    if args.control or args.idle_after:
+        control = Control(args.idle_after, args.idle_release, lambda: open_camera(args.camera))
+        if args.control:
+            serve_control(control, args.control)
+        if stats is not None:
+            stats.add_counters("control", control.counters)
+    fanout = None
+    if args.serve:
+        fanout = FanoutServer({"json": encode_json, "binary": encode_binary}, args.host, args.serve,
+                              on_activity=control.heartbeat if control is not None else None).start()
+    ring = None
+    if args.shm is not None:
+        from shmring import DEFAULT_PATH, RingWriter
+        ring = RingWriter(args.shm or DEFAULT_PATH)
+    if args.source:
+        from multicam import run_supervised     # imported here: multicam.py builds on this module
+        run_supervised(args, sock, stats, fanout, ring, startup)
+        return
 
-    now = time.time()
-    fps = 1.0 / max(1e-6, (now - prev)); prev = now
+    delta = DeltaEncoder(args.keyframe_every, args.delta_eps)
+    recorder = TraceWriter(args.record) if args.record else None
+    stab = make_stabilizer(args)
+    motion = MotionGestures() if args.motion else None
+    sender = Sender(sock, (args.host, args.port), args.format, delta, recorder, stats, stab, fanout, ring,
+                    motion, args.send_rate, args.repeat_edges)
+    sender.on_first = startup.first_packet
+    # starting idle with --idle-release: open the camera only once a consumer shows up
+    cap = None if control is not None and args.idle_release and not control.active() else open_camera(args.camera)
+    if cap is not None:
+        cap.grab()                  # start streaming (and auto-exposure) while the model finishes
+        startup.mark("camera")
+    step, adaptive = model.result()
+    startup.mark("model")
+    if adaptive is not None and stats is not None:
+        stats.add_counters("inference", adaptive.counters)
 
-    pkt = to_packet(results, fps, gestures_raw, gesture, changed, tracking)
-    buf = json.dumps(pkt, separators=(",",":"), allow_nan=False).encode("utf-8")
-    sock.sendto(buf, ADDR)
+    run = run_pipelined if args.pipeline else run_serial
+    viewer = None
+    try:
+        if cap is not None and not cap.isOpened():
+            raise SystemExit(f"ERROR: could not open camera {args.camera}.")
+        if args.view:
+            from viewer import Viewer
+            viewer = sender.viewer = Viewer().start()
+        run(cap, step, sender, control, viewer)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if control is not None:
+            cap = control.cap or cap
+        if cap is not None:
+            cap.release()
+        sender.close()
+        if viewer is not None:
+            viewer.close()
+        if adaptive is not None:
+            print(adaptive.summary())
+        if recorder is not None:
+            recorder.close()
+        if ring is not None:
+            ring.close()
 
-cap.release()
+if __name__ == "__main__":
+    main()
 
 # import socket, json, time, cv2
 # import mediapipe as mp
-# from collections import deque, Counter
-# from gestures import detect_gestures
+# # from gestures import detect_gestures
 #
 # ADDR = ("127.0.0.1", 54545)
 # sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -0,0 +1,320 @@
+# motion.py
+"""
+Motion gestures (main.py --motion): wave, swipe, jump and clap, which a
+single frame can't show.
+
+History keeps the last `capacity` frames in preallocated arrays and
+computes each landmark's velocity and acceleration as a frame is pushed;
+RunningSum keeps windowed totals by adding the new value and subtracting
+the one that falls out. Every frame therefore costs the same handful of
+array and float operations, and memory is fixed however long the session
+runs.
+
+  Wave (L/R)    wrist above its elbow, at least WAVE_REVERSALS changes of
+                horizontal direction within WAVE_WINDOW seconds, each after
+                travelling WAVE_AMP shoulder widths
+  Swipe Left/   wrist moving fast one way for most of SWIPE_TIME seconds
+  Swipe Right   and covering SWIPE_DIST shoulder widths, mostly horizontally
+  Jump          hips rise JUMP_RISE shoulder widths above their resting
+                height while moving up fast, and the ankles leave the floor
+  Clap          wrists come within CLAP_TOUCH shoulder widths less than
+                CLAP_WINDOW seconds after being CLAP_OPEN apart
+
+Landmarks are the mirrored ones main.infer produces, so "Swipe Left" is
+towards the left of the screen. MotionGestures.merge() overlays events on
+the stabilizer's output: an event becomes the packet's `gesture` with
+`changed` set, stays for `hold` seconds, then the stable pose comes back
+with another `changed` edge.
+
+`python motion.py` runs synthetic clips of each gesture and reports what
+fired and the cost per frame.
+"""
+import math
+import numpy as np
+from poses import M, MOTION_LABELS
+
+LW, RW, LE, RE, LS, RS, LH, RH, LA, RA = (M[n].value for n in (
+    "LEFT_WRIST", "RIGHT_WRIST", "LEFT_ELBOW", "RIGHT_ELBOW", "LEFT_SHOULDER", "RIGHT_SHOULDER",
+    "LEFT_HIP", "RIGHT_HIP", "LEFT_ANKLE", "RIGHT_ANKLE"))
+
+VIS = 0.5                   # min visibility of the landmarks a gesture looks at
+WAVE_WINDOW = 1.2           # seconds
+WAVE_REVERSALS = 3
+WAVE_SPEED = 1.5            # shoulder widths / s before a direction counts
+WAVE_AMP = 0.25             # shoulder widths between reversals
+SWIPE_TIME = 0.3            # seconds
+SWIPE_DIST = 1.2            # shoulder widths
+JUMP_RISE = 0.25            # shoulder widths, hips
+JUMP_FEET = 0.15            # shoulder widths, ankles
+JUMP_SPEED = 1.5            # shoulder widths / s upwards
+JUMP_BASELINE = 1.5         # seconds of resting hip / ankle height
+CLAP_OPEN = 1.0             # shoulder widths
+CLAP_TOUCH = 0.35
+CLAP_WINDOW = 0.6           # seconds
+COOLDOWN = 0.8              # seconds before the same event can fire again
+
+class History:
+    """
+    The last `capacity` frames as fixed arrays: positions, visibility,
+    velocity and acceleration (per landmark and axis, in units/s and
+    units/s^2). push() overwrites the oldest slot.
+    """
+    def __init__(self, capacity=64, n=33):
+        self.capacity = capacity
+        self.t = np.zeros(capacity)
+        self.pos = np.zeros((capacity, n, 3), np.float32)
+        self.vis = np.zeros((capacity, n), np.float32)
+        self.vel = np.zeros((capacity, n, 3), np.float32)
+        self.acc = np.zeros((capacity, n, 3), np.float32)
+        self.i = -1                 # slot of the newest frame
+        self.count = 0              # frames held, up to capacity
+
+    def push(self, lm, t):
+        prev, i = self.i, (self.i + 1) % self.capacity
+        self.t[i] = t
+        self.pos[i] = lm[:, :3]
+        self.vis[i] = lm[:, 3]
+        if self.count:
+            dt = max(1e-3, t - self.t[prev])
+            np.subtract(self.pos[i], self.pos[prev], out=self.vel[i])
+            self.vel[i] /= dt
+            np.subtract(self.vel[i], self.vel[prev], out=self.acc[i])
+            self.acc[i] /= dt
+        else:
+            self.vel[i] = 0.0
+        if self.count < 2:
+            self.acc[i] = 0.0
+        self.i = i
+        self.count = min(self.count + 1, self.capacity)
+
+    def ago(self, k):
+        """Slot of the frame k pushes back (0 = newest); needs k < count."""
+        return (self.i - k) % self.capacity
+
+    def reset(self):
+        self.count = 0
+
+class RunningSum:
+    """Sum of the last `size` values pushed, in O(1) per push."""
+    def __init__(self, size):
+        self.values = [0.0] * size
+        self.i = 0
+        self.n = 0
+        self.total = 0.0
+
+    def push(self, v):
+        self.total += v - self.values[self.i]
+        self.values[self.i] = v
+        self.i += 1
+        if self.i == len(self.values):
+            self.i = 0
+            self.total = sum(self.values)   # once per lap, so float error can't build up
+        self.n = min(self.n + 1, len(self.values))
+
+    def mean(self):
+        return self.total / max(1, self.n)
+
+    def reset(self):
+        self.values = [0.0] * len(self.values)
+        self.i = self.n = 0
+        self.total = 0.0
+
+class _Hand:
+    """Per-wrist wave/swipe state."""
+    def __init__(self, wrist, elbow, wave_frames, swipe_frames):
+        self.wrist, self.elbow = wrist, elbow
+        self.direction = 0          # last significant horizontal direction, -1 / 0 / 1
+        self.turn_x = None          # wrist x where that direction started
+        self.x = None               # wrist x on the previous frame
+        self.reversals = RunningSum(wave_frames)
+        self.signs = RunningSum(swipe_frames)
+
+class MotionGestures:
+    def __init__(self, fps=30.0, hold=0.6, cooldown=COOLDOWN):
+        frames = lambda secs: max(2, round(secs * fps))
+        self.hist = History(max(frames(JUMP_BASELINE), frames(WAVE_WINDOW)) + 1)
+        self.swipe_k = frames(SWIPE_TIME)
+        self.hands = {"L": _Hand(LW, LE, frames(WAVE_WINDOW), self.swipe_k),
+                      "R": _Hand(RW, RE, frames(WAVE_WINDOW), self.swipe_k)}
+        self.hip_base = RunningSum(frames(JUMP_BASELINE))
+        self.feet_base = RunningSum(frames(JUMP_BASELINE))
+        self.base_min = frames(0.5)     # resting frames needed before a jump can fire
+        self.scale = None           # shoulder width, smoothed
+        self.apart_at = -math.inf   # last time the wrists were CLAP_OPEN apart
+        self.clap_armed = True
+        self.cooldown = cooldown
+        self.fired = {}             # label -> time it last fired
+        self.hold = hold
+        self.active = ""            # event currently shown instead of the stable pose
+        self.until = 0.0
+        self.counts = dict.fromkeys(MOTION_LABELS, 0)
+
+    def reset(self):
+        self.hist.reset()
+        for hand in self.hands.values():
+            hand.direction, hand.turn_x, hand.x = 0, None, None
+            hand.reversals.reset()
+            hand.signs.reset()
+        self.hip_base.reset()
+        self.feet_base.reset()
+        self.apart_at = -math.inf
+
+    def update(self, lm, t):
+        """Push one frame ((33, 4) array or None); returns the event it completes, or ""."""
+        if lm is None:
+            self.reset()
+            return ""
+        h = self.hist
+        h.push(lm, t)
+        # plain floats from here on: cheaper than indexing NumPy scalars
+        p, v, vis = h.pos[h.i].tolist(), h.vel[h.i].tolist(), h.vis[h.i].tolist()
+
+        if vis[LS] >= VIS and vis[RS] >= VIS:
+            sw = max(0.05, math.hypot(p[LS][0] - p[RS][0], p[LS][1] - p[RS][1]))
+            self.scale = sw if self.scale is None else self.scale + 0.1 * (sw - self.scale)
+        if self.scale is None or h.count < 2:
+            return ""
+        s = self.scale
+
+        event = self._clap(p, vis, s, t) or self._jump(p, v, vis, s)
+        for side, hand in self.hands.items():
+            event = self._hand(side, hand, p, v, vis, s) or event
+        if event and t - self.fired.get(event, -math.inf) >= self.cooldown:
+            self.fired[event] = t
+            self.counts[event] += 1
+            return event
+        return ""
+
+    def _clap(self, p, vis, s, t):
+        if vis[LW] < VIS or vis[RW] < VIS:
+            return ""
+        d = math.hypot(p[LW][0] - p[RW][0], p[LW][1] - p[RW][1]) / s
+        if d > CLAP_OPEN:
+            self.apart_at = t
+            self.clap_armed = True
+        elif self.clap_armed and d < CLAP_TOUCH and t - self.apart_at < CLAP_WINDOW:
+            self.clap_armed = False
+            return "Clap"
+        return ""
+
+    def _jump(self, p, v, vis, s):
+        if vis[LH] < VIS or vis[RH] < VIS:
+            return ""
+        hip_y = 0.5 * (p[LH][1] + p[RH][1])
+        vy = 0.5 * (v[LH][1] + v[RH][1]) / s
+        feet = vis[LA] >= VIS and vis[RA] >= VIS
+        feet_y = 0.5 * (p[LA][1] + p[RA][1]) if feet else 0.0
+        event = ""
+        if self.hip_base.n >= self.base_min and -vy > JUMP_SPEED and (self.hip_base.mean() - hip_y) / s > JUMP_RISE:
+            # ankles must rise too, or it was only standing up from a squat
+            if not feet or self.feet_base.n < self.base_min or (self.feet_base.mean() - feet_y) / s > JUMP_FEET:
+                event = "Jump"
+        if abs(vy) < 1.0:           # resting height only learns from frames at rest
+            self.hip_base.push(hip_y)
+            if feet:
+                self.feet_base.push(feet_y)
+        return event
+
+    def _hand(self, side, hand, p, v, vis, s):
+        w = hand.wrist
+        if vis[w] < VIS:
+            hand.direction, hand.turn_x, hand.x = 0, None, None
+            hand.reversals.push(0)
+            hand.signs.push(0)
+            return ""
+        x = p[w][0] / s
+        vx = v[w][0] / s
+        d = (vx > WAVE_SPEED) - (vx < -WAVE_SPEED)
+        reversal = 0
+        if d and d != hand.direction:
+            up = vis[hand.elbow] >= VIS and p[w][1] < p[hand.elbow][1]
+            # amplitude of the stroke that just ended, up to the previous frame
+            if hand.direction and up and abs(hand.x - hand.turn_x) >= WAVE_AMP:
+                reversal = 1
+            hand.direction, hand.turn_x = d, hand.x if hand.x is not None else x
+        hand.x = x
+        hand.reversals.push(reversal)
+        hand.signs.push(d)
+        if hand.reversals.total >= WAVE_REVERSALS:
+            hand.reversals.reset()
+            return f"Wave ({side})"
+
+        k = self.swipe_k
+        if abs(hand.signs.total) >= 0.6 * k and hand.reversals.total == 0 and self.hist.count > k:
+            q = self.hist.pos[self.hist.ago(k), w]
+            dx, dy = (p[w][0] - float(q[0])) / s, (p[w][1] - float(q[1])) / s
+            if abs(dx) >= SWIPE_DIST and abs(dy) < 0.6 * abs(dx):
+                hand.signs.reset()
+                return "Swipe Left" if dx < 0 else "Swipe Right"
+        return ""
+
+    def merge(self, lm, t, gesture, changed):
+        """Stabilizer output (gesture, changed) -> what the packet carries after this frame."""
+        event = self.update(lm, t)
+        if event:
+            self.active, self.until = event, t + self.hold
+            return event, True
+        if self.active:
+            if t < self.until:
+                return self.active, False
+            self.active = ""
+            return gesture, True    # edge back to the stable pose
+        return gesture, changed
+
+# ---------- synthetic clips ----------
+def standing(rng=None):
+    """A standing player facing the camera, arms down, as a (33, 4) array."""
+    lm = np.zeros((33, 4), np.float32)
+    lm[:, :2] = (0.5, 0.3)
+    lm[:, 3] = 0.95
+    pose = {LS: (0.4, 0.35), RS: (0.6, 0.35), LE: (0.38, 0.5), RE: (0.62, 0.5), LW: (0.38, 0.62),
+            RW: (0.62, 0.62), LH: (0.44, 0.65), RH: (0.56, 0.65), LA: (0.44, 0.95), RA: (0.56, 0.95)}
+    for i, xy in pose.items():
+        lm[i, :2] = xy
+    return lm
+
+def clip(kind, fps=30.0, secs=3.0, noise=0.003, seed=0):
+    """(frames, times) of a standing player doing `kind` once in the middle ("still" = nothing)."""
+    rng = np.random.default_rng(seed)
+    n = int(secs * fps)
+    t = np.arange(n) / fps
+    frames = np.repeat(standing()[None], n, axis=0)
+    a, b = int(n * 0.4), int(n * 0.4 + fps)     # one second of action
+    active = (np.arange(n) >= a) & (np.arange(n) < b)
+    if kind == "wave":
+        frames[:, RE, :2] = (0.66, 0.32)
+        frames[:, RW, :2] = (0.68, 0.15)
+        frames[active, RW, 0] += 0.06 * np.sin(2 * np.pi * 2.0 * (t[active] - t[a]))
+    elif kind == "swipe":
+        frames[:, RW, 1] = 0.45
+        frames[:, RW, 0] = 0.7 - 0.4 * np.clip((np.arange(n) - a) / (0.25 * fps), 0.0, 1.0)
+    elif kind == "jump":
+        frames[:, :, 1] -= 0.1 * np.sin(np.pi * np.clip((np.arange(n) - a) / (0.5 * fps), 0.0, 1.0))[:, None]
+    elif kind == "clap":
+        close = np.clip((np.arange(n) - a) / (0.2 * fps), 0.0, 1.0)
+        frames[:, LW, :2] = np.stack([0.28 + 0.2 * close, np.full(n, 0.45)], 1)
+        frames[:, RW, :2] = np.stack([0.72 - 0.2 * close, np.full(n, 0.45)], 1)
+    frames[:, :, :3] += rng.normal(0.0, noise, (n, 33, 3))
+    return frames, t
+
+if __name__ == "__main__":
+    import time
+    for kind in ("still", "wave", "swipe", "jump", "clap"):
+        fired = []
+        for seed in range(20):
+            mg = MotionGestures()
+            frames, t = clip(kind, secs=4.0, seed=seed)
+            fired += [e for e in (mg.update(lm, ti) for lm, ti in zip(frames, t)) if e]
+        summary = ", ".join(f"{e} x{fired.count(e)}" for e in sorted(set(fired))) or "nothing"
+        print(f"{kind:6} (20 clips): {summary}")
+
+    mg = MotionGestures()
+    frames, t = clip("wave", secs=60.0)
+    for rounds in (1, 10):
+        t0 = time.perf_counter()
+        for r in range(rounds):
+            for lm, ti in zip(frames, t + r * 60.0):
+                mg.update(lm, ti)
+        n = rounds * len(frames)
+        print(f"{n:6} frames: {(time.perf_counter() - t0) / n * 1e6:5.1f} us/frame, "
+              f"history {mg.hist.pos.nbytes + mg.hist.vel.nbytes + mg.hist.acc.nbytes} bytes")
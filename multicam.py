@@ -0,0 +1,229 @@
+# multicam.py
+"""
+Several cameras / players from one sender:
+
+  python main.py --source 0 --source 2            # two webcams
+  python main.py --source 0 --source clip.mp4     # a camera and a recording
+
+The supervisor (the main.py process) starts one worker process per
+source. Each worker owns its capture, mp_pose.Pose, classifier and
+stabilizer, runs the same frame path as main.run_serial, and sends one
+small record per frame back over its own pipe:
+
+  (t_cap, landmarks (33, 4) float32 or None, label, held, lat, gesture, changed, t_sent)
+
+The supervisor tags each record with the player id (the source's position
+on the command line) and emits it through that player's Sender; all
+Senders share one socket / fan-out server / shared-memory ring and stats.
+Packets carry "player" (JSON) or the player byte (binary, see wire.py);
+seq, fps and delta state are per player.
+
+Workers are processes, so inference uses all cores without GIL
+contention. With a pipe per worker a crash only closes that worker's
+pipe: the supervisor restarts it after a backoff (1 s, doubling up to
+30 s, reset once a worker has run for a minute) and the other players
+keep streaming. Video files play at their own frame rate and are not
+restarted once they end; a camera that stops delivering frames counts as
+a crash.
+"""
+import os, time, functools
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing as mp_proc
+from multiprocessing.connection import wait
+import cv2
+import rules
+import stabilizer
+from main import FramePool, Sample, Sender, make_inference, make_stabilizer, open_camera, read_frame
+from delta import DeltaEncoder
+from motion import MotionGestures
+from recording import TraceWriter
+from replay import results_from_array
+
+RESTART_MIN = 1.0           # seconds before the first restart of a crashed worker
+RESTART_MAX = 30.0
+HEALTHY = 60.0              # seconds of running that reset the backoff
+
+# main.py options every worker needs
+OPTS = ("model_complexity", "adaptive", "target_fps", "smooth", "motion", "stabilizer", "window", "window_ms",
+        "enter", "exit", "rules")
+
+def parse_source(src):
+    """'0' -> camera index 0, anything else is a video path."""
+    return int(src) if str(src).isdigit() else src
+
+def worker(player, source, opts, conn):
+    """Worker process body; exit code 0 means the video ended, anything else is a crash."""
+    try:
+        rules.default().load(opts["rules"])
+        rules.default().watch()
+        video = not isinstance(source, int)
+        # build the model while the capture opens, as main() does
+        with ThreadPoolExecutor(1, thread_name_prefix="model") as builder:
+            model = builder.submit(make_inference, opts["model_complexity"], opts["adaptive"], opts["target_fps"],
+                                   opts["smooth"])
+            cap = cv2.VideoCapture(source) if video else open_camera(source)
+            if not cap.isOpened():
+                raise SystemExit(f"player {player}: could not open {source!r}")
+            step, _ = model.result()
+        period = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if video else 0.0
+        stab = make_stabilizer(SimpleNamespace(**opts))
+        motion = MotionGestures() if opts["motion"] else None
+        pool = FramePool()
+        due = time.perf_counter()
+        while True:
+            if period:
+                due += period
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            s = read_frame(cap, pool)
+            if s is None:
+                if video:
+                    return
+                raise SystemExit(f"player {player}: camera {source} stopped delivering frames")
+            step(s)
+            pool.release(s.frame)
+            weight = stabilizer.confidence(s.landmarks()) if stab.weighted else 1.0
+            gesture, changed = stab.update(s.label, None, weight)
+            if motion is not None:
+                gesture, changed = motion.merge(s.landmarks(), s.t_cap, gesture, changed)
+            conn.send((s.t_cap, s.landmarks(), s.label, s.held, s.lat, gesture, changed, time.time()))
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass                    # Ctrl-C reaches the whole process group; the supervisor handles it
+
+class Worker:
+    """One source: its process, pipe and restart bookkeeping."""
+    def __init__(self, player, source):
+        self.player = player
+        self.source = source
+        self.proc = None
+        self.conn = None
+        self.started = 0.0
+        self.restart_at = 0.0
+        self.backoff = RESTART_MIN
+        self.restarts = 0
+        self.frames = 0
+        self.done = False
+
+class Supervisor:
+    def __init__(self, sources, opts):
+        # spawn, not fork: the parent already runs the rules watcher and fan-out threads
+        self.ctx = mp_proc.get_context("spawn")
+        self.workers = [Worker(i, parse_source(src)) for i, src in enumerate(sources)]
+        self.opts = opts
+
+    def _start(self, w):
+        recv, send = self.ctx.Pipe(duplex=False)
+        w.proc = self.ctx.Process(target=worker, args=(w.player, w.source, self.opts, send),
+                                  name=f"player{w.player}", daemon=True)
+        w.proc.start()
+        send.close()            # keep only the worker's end open so its death shows up as EOF
+        w.conn = recv
+        w.started = time.monotonic()
+
+    def _check(self, w, now):
+        """Reap a dead worker and restart it once its backoff has passed."""
+        if w.done:
+            return
+        if w.proc is None:
+            if now >= w.restart_at:
+                self._start(w)
+            return
+        if w.proc.is_alive():
+            if now - w.started > HEALTHY:
+                w.backoff = RESTART_MIN
+            return
+        w.proc.join()
+        code = w.proc.exitcode
+        if w.conn is not None:
+            w.conn.close()
+        w.proc = w.conn = None
+        if code == 0:
+            print(f"player {w.player}: {w.source} finished")
+            w.done = True
+            return
+        print(f"player {w.player}: worker exited with code {code}; restarting in {w.backoff:.0f}s")
+        w.restarts += 1
+        w.restart_at = now + w.backoff
+        w.backoff = min(RESTART_MAX, w.backoff * 2)
+
+    def run(self, senders):
+        """Forward worker records to senders[player] until every source has finished."""
+        for w in self.workers:
+            self._start(w)
+        while not all(w.done for w in self.workers):
+            conns = {w.conn: w for w in self.workers if w.conn is not None}
+            if conns:
+                ready = wait(list(conns), timeout=0.25)
+            else:
+                time.sleep(0.25)
+                ready = []
+            for conn in ready:
+                w = conns[conn]
+                try:
+                    rec = conn.recv()
+                except (EOFError, OSError):
+                    # worker is exiting; stop polling its pipe and let _check reap it
+                    # without blocking the other players' streams
+                    conn.close()
+                    w.conn = None
+                    continue
+                w.frames += 1
+                senders[w.player].emit(to_sample(w.player, rec), vote=rec[5:7])
+            now = time.monotonic()
+            for w in self.workers:
+                self._check(w, now)
+
+    def stop(self):
+        for w in self.workers:
+            if w.proc is not None and w.proc.is_alive():
+                w.proc.terminate()
+        for w in self.workers:
+            if w.proc is not None:
+                w.proc.join(1.0)
+
+    def summary(self):
+        return "\n".join(f"player {w.player} ({w.source}): {w.frames} frames, {w.restarts} restarts"
+                         for w in self.workers)
+
+def to_sample(player, rec):
+    t_cap, lm, label, held, lat, _, _, t_sent = rec
+    s = Sample(None, t_cap)
+    s.results = results_from_array(lm)
+    s.label = label
+    s.held = held
+    s.player = player
+    s.lat = lat
+    lat["q_send"] = round((time.time() - t_sent) * 1000.0, 2)
+    return s
+
+def run_supervised(args, sock, stats=None, fanout=None, ring=None, startup=None):
+    """
+    main.py --source ...: one Sender per player on the shared socket.
+    startup (main.Startup) reports each player's first packet.
+    """
+    opts = {name: getattr(args, name) for name in OPTS}
+    senders, recorders = [], []
+    for i in range(len(args.source)):
+        recorder = TraceWriter(os.path.join(args.record, f"player{i}")) if args.record else None
+        if recorder is not None:
+            recorders.append(recorder)
+        delta = DeltaEncoder(args.keyframe_every, args.delta_eps)
+        senders.append(Sender(sock, (args.host, args.port), args.format, delta, recorder, stats, None, fanout,
+                              ring, rate=args.send_rate, repeat=args.repeat_edges))
+        if startup is not None:
+            senders[-1].on_first = functools.partial(startup.first_packet, f"player{i}")
+
+    sup = Supervisor(args.source, opts)
+    try:
+        sup.run(senders)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sup.stop()
+        for sender in senders:
+            sender.close()
+        for recorder in recorders:
+            recorder.close()
+        print(sup.summary())
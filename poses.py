@@ -1,8 +1,56 @@
 import math
-import mediapipe as mp
+from collections import namedtuple
+from enum import IntEnum
+import numpy as np
 
-mp_pose = mp.solutions.pose
-M = mp_pose.PoseLandmark
+# mp.solutions.pose.PoseLandmark, spelled out: importing mediapipe takes most
+# of a second (it pulls in matplotlib for drawing_utils), and only the
+# process that runs the model needs it. Same names, same order.
+M = IntEnum("PoseLandmark", [
+    "NOSE", "LEFT_EYE_INNER", "LEFT_EYE", "LEFT_EYE_OUTER", "RIGHT_EYE_INNER", "RIGHT_EYE", "RIGHT_EYE_OUTER",
+    "LEFT_EAR", "RIGHT_EAR", "MOUTH_LEFT", "MOUTH_RIGHT", "LEFT_SHOULDER", "RIGHT_SHOULDER", "LEFT_ELBOW",
+    "RIGHT_ELBOW", "LEFT_WRIST", "RIGHT_WRIST", "LEFT_PINKY", "RIGHT_PINKY", "LEFT_INDEX", "RIGHT_INDEX",
+    "LEFT_THUMB", "RIGHT_THUMB", "LEFT_HIP", "RIGHT_HIP", "LEFT_KNEE", "RIGHT_KNEE", "LEFT_ANKLE", "RIGHT_ANKLE",
+    "LEFT_HEEL", "RIGHT_HEEL", "LEFT_FOOT_INDEX", "RIGHT_FOOT_INDEX"], start=0)
+
+# Stand-in for a MediaPipe landmark when working from arrays (replay, tests, benchmarks)
+Landmark = namedtuple("Landmark", "x y z visibility")
+
+def landmarks_to_array(lms):
+    """(N, 4) float32 array of x, y, z, visibility."""
+    return np.array([(p.x, p.y, getattr(p, "z", 0.0), getattr(p, "visibility", 0.0)) for p in lms],
+                    dtype=np.float32)
+
+def landmarks_from_array(arr):
+    return [Landmark(*row) for row in arr.tolist()]
+
+# ---------- mirroring ----------
+# The camera image is shown mirrored, so the player's right hand is on the
+# right of the picture. Instead of flipping every frame we run the model on
+# the raw image and mirror its landmarks: x -> 1 - x, and each LEFT_* /
+# RIGHT_* landmark takes its counterpart's place, which reproduces what the
+# model reports on a flipped image.
+def _counterpart(name):
+    swap = {"LEFT": "RIGHT", "RIGHT": "LEFT"}
+    return "_".join(swap.get(part, part) for part in name.split("_"))
+
+MIRROR = [M[_counterpart(m.name)].value for m in M]      # index of each landmark's counterpart
+MIRROR_PAIRS = [(i, j) for i, j in enumerate(MIRROR) if i < j]
+
+def mirror_landmarks(lms):
+    """Mirror a MediaPipe landmark list in place (allocates no new landmarks)."""
+    for i, j in MIRROR_PAIRS:
+        a, b = lms[i], lms[j]
+        a.x, a.y, a.z, a.visibility, a.presence, b.x, b.y, b.z, b.visibility, b.presence = \
+            b.x, b.y, b.z, b.visibility, b.presence, a.x, a.y, a.z, a.visibility, a.presence
+    for p in lms:
+        p.x = 1.0 - p.x
+
+def mirror_array(arr):
+    """mirror_landmarks for an (..., 33, 4) array; returns a new array."""
+    out = arr[..., MIRROR, :]
+    out[..., 0] = 1.0 - out[..., 0]
+    return out
 
 def pt(lms, name):
     return lms[M[name].value]
@@ -58,79 +106,154 @@ POSE_LABELS = {
     "Stop Pose",
 }
 
+# Events from motion.py (main.py --motion), sent in the same gesture field
+MOTION_LABELS = ("Wave (L)", "Wave (R)", "Swipe Left", "Swipe Right", "Jump", "Clap")
+
+# Stable numeric ids for the binary wire format; 0 means no pose. Append only.
+LABELS = (
+    "",
+    "Tough Guy Pose",
+    "Muscle Man Pose",
+    "What? Pose",
+    "Point Up Pose (L)",
+    "Point Up Pose (R)",
+    "Samurai Pose",
+    "Stop Pose",
+) + MOTION_LABELS
+LABEL_ID = {label: i for i, label in enumerate(LABELS)}
+
 # ---------- main classifier ----------
 def classify_pose(lms):
     """
     Returns one of:
     'Tough Guy Pose', 'Muscle Man Pose', 'What? Pose',
     'Point Up Pose (L/R)', 'Samurai Pose', 'Stop Pose', or ''.
+
+    The rules and thresholds live in pose_rules.json and are compiled by
+    rules.py; this uses the process-wide rules.default().
     """
-    s = torso_scale(lms)
+    return (_rules or _load_rules()).classify(lms)
 
-    lw, rw = pt(lms,"LEFT_WRIST"), pt(lms,"RIGHT_WRIST")
-    le, re = pt(lms,"LEFT_ELBOW"), pt(lms,"RIGHT_ELBOW")
-    ls, rs = pt(lms,"LEFT_SHOULDER"), pt(lms,"RIGHT_SHOULDER")
-    lh, rh = pt(lms,"LEFT_HIP"), pt(lms,"RIGHT_HIP")
-    leye = pt(lms,"LEFT_EYE")
-    reye = pt(lms,"RIGHT_EYE")
-    nose = pt(lms,"NOSE")
-
-    ok = vis_ok
-
-    # Precompute safe angles
-    ang_le = angle(ls, le, lw) if all(map(ok,(ls,le,lw))) else 180
-    ang_re = angle(rs, re, rw) if all(map(ok,(rs,re,rw))) else 180
-
-    # 1) Tough Guy (arms crossed)
-    if all(map(ok,(rw,ls,lw,rs))) and near(rw, ls, s, 0.45) and near(lw, rs, s, 0.45):
-        return "Tough Guy Pose"
-
-    # 2) Muscle Man (double biceps)
-    if all(map(ok,(lw, rw, le, re, ls, rs, nose))):
-        wrists_high = (above(lw, ls, 0.05) or above(lw, nose, -0.02)) and \
-                      (above(rw, rs, 0.05) or above(rw, nose, -0.02))
-        elbows_bent = (50 <= ang_le <= 120) and (50 <= ang_re <= 120)
-        if wrists_high and elbows_bent:
-            return "Muscle Man Pose"
-
-    # 3) What? (shrug) – wrists between shoulder and elbow bands + bent elbows
-    if all(map(ok,(lw,rw,ls,rs,nose,le,re))):
-        left_in_band  = between_vertical(lw, ls, le, s, top_eps=0.14, bot_eps=0.12)
-        right_in_band = between_vertical(rw, rs, re, s, top_eps=0.14, bot_eps=0.12)
-        elbows_bentish = (ang_le < 150 and ang_re < 150)
-        if left_in_band and right_in_band and elbows_bentish:
-            return "What? Pose"
-
-    # 4) Point Up: exactly one straight-up arm
-    up_l = all(map(ok,(lw, le, ls))) and above(lw, ls, 0.15) and ang_le > 150
-    up_r = all(map(ok,(rw, re, rs))) and above(rw, rs, 0.15) and ang_re > 150
-    if up_l ^ up_r:
-        return "Point Up Pose (L)" if up_l else "Point Up Pose (R)"
-
-    # 5) Samurai: one arm horizontal (extended) + other hand near opposite hip
-    arm_l_horizontal = all(map(ok,(ls,le,lw))) and ang_le > 150 and horiz_aligned(lw, ls, s, 0.10)
-    arm_r_horizontal = all(map(ok,(rs,re,rw))) and ang_re > 150 and horiz_aligned(rw, rs, s, 0.10)
-    hand_on_hip_l = all(map(ok,(lw,lh))) and near(lw, lh, s, 0.55)
-    hand_on_hip_r = all(map(ok,(rw,rh))) and near(rw, rh, s, 0.55)
-    if (arm_l_horizontal and hand_on_hip_r) or (arm_r_horizontal and hand_on_hip_l):
-        return "Samurai Pose"
-
-    # 6) Stop: hand up near face, above shoulder, within face band, elbow bent, forwardish
-    if all(map(ok, (lw, rw, nose, ls, rs, le, re, leye, reye))):
-        head_top_y = min(nose.y, leye.y, reye.y)
-
-        def is_stop(wrist, elbow, shoulder):
-            close_to_face  = near(wrist, nose, s, 0.45)
-            above_shoulder = wrist.y < shoulder.y - 0.02 * s
-            not_too_high   = wrist.y >= head_top_y - 0.12 * s
-            elbow_bentish  = angle(shoulder, elbow, wrist) < 150
-            forwardish     = (getattr(wrist, "z", 0.0) < getattr(elbow, "z", 0.0) - 0.03)
-            lateral_ok     = abs(wrist.x - nose.x) <= 0.30 * s
-            return close_to_face and above_shoulder and not_too_high and elbow_bentish and forwardish and lateral_ok
-
-        if (all(map(ok,(lw,le,ls))) and is_stop(lw, le, ls)) or \
-           (all(map(ok,(rw,re,rs))) and is_stop(rw, re, rs)):
-            return "Stop Pose"
-
-    return ""
+_rules = None
+
+def _load_rules():
+    global _rules
+    import rules    # not at the top: rules.py imports this module's helpers
+    _rules = rules.default()
+    return _rules
+
+
+# ---------- batched classifier ----------
+# The default pose_rules.json hand-vectorized for many frames at once (offline
+# labelling, threshold tuning); `python rules.py` checks the two agree.
+# Works in float64 so labels match exactly.
+_I = {m.name: m.value for m in M}
+
+def classify_batch(arr):
+    """
+    Vectorized classify_pose over an (N, 33, 4) array of x, y, z, visibility.
+    Returns an (N,) uint8 array of indices into LABELS.
+    """
+    # (4, 33, N) so every per-landmark column below is contiguous
+    X, Y, Z, V = np.ascontiguousarray(np.transpose(arr, (2, 1, 0)), dtype=np.float64)
+    VIS = (V >= 0.6) & (X >= -0.05) & (X <= 1.05) & (Y >= -0.05) & (Y <= 1.05)
+
+    x = lambda n: X[_I[n]]
+    y = lambda n: Y[_I[n]]
+    ok = lambda *names: np.logical_and.reduce([VIS[_I[n]] for n in names])
+
+    def d(p, q):
+        return np.hypot(x(p) - x(q), y(p) - y(q))
+
+    def ang(a_, b_, c_):
+        abx, aby = x(a_) - x(b_), y(a_) - y(b_)
+        cbx, cby = x(c_) - x(b_), y(c_) - y(b_)
+        den = np.hypot(abx, aby) * np.hypot(cbx, cby)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cosv = np.clip((abx*cbx + aby*cby) / den, -1.0, 1.0)
+        return np.where(den == 0, 180.0, np.degrees(np.arccos(cosv)))
+
+    # torso_scale
+    s = np.where(ok("LEFT_SHOULDER", "RIGHT_SHOULDER", "LEFT_HIP", "RIGHT_HIP"),
+                 np.clip(0.6*d("LEFT_SHOULDER", "RIGHT_SHOULDER")
+                         + 0.4*(0.5*(d("LEFT_SHOULDER", "LEFT_HIP") + d("RIGHT_SHOULDER", "RIGHT_HIP"))),
+                         0.25, 0.7),
+                 0.35)
+
+    LW, RW, LE, RE = "LEFT_WRIST", "RIGHT_WRIST", "LEFT_ELBOW", "RIGHT_ELBOW"
+    LS, RS, LH, RH = "LEFT_SHOULDER", "RIGHT_SHOULDER", "LEFT_HIP", "RIGHT_HIP"
+    LEYE, REYE, NOSE = "LEFT_EYE", "RIGHT_EYE", "NOSE"
+
+    arm_l, arm_r = ok(LS, LE, LW), ok(RS, RE, RW)
+    ang_le = np.where(arm_l, ang(LS, LE, LW), 180.0)
+    ang_re = np.where(arm_r, ang(RS, RE, RW), 180.0)
+
+    # 1) Tough Guy
+    tough = ok(RW, LS, LW, RS) & (d(RW, LS) <= 0.45 * s) & (d(LW, RS) <= 0.45 * s)
+
+    # 2) Muscle Man
+    wrists_high = ((y(LW) < y(LS) - 0.05) | (y(LW) < y(NOSE) - -0.02)) & \
+                  ((y(RW) < y(RS) - 0.05) | (y(RW) < y(NOSE) - -0.02))
+    elbows_bent = (50 <= ang_le) & (ang_le <= 120) & (50 <= ang_re) & (ang_re <= 120)
+    muscle = ok(LW, RW, LE, RE, LS, RS, NOSE) & wrists_high & elbows_bent
+
+    # 3) What?
+    def in_band(p, top, bottom):
+        top_y = np.minimum(y(top), y(bottom))
+        bot_y = np.maximum(y(top), y(bottom))
+        return (y(p) >= top_y - 0.14 * s) & (y(p) <= bot_y + 0.12 * s)
+    what = ok(LW, RW, LS, RS, NOSE, LE, RE) & in_band(LW, LS, LE) & in_band(RW, RS, RE) & \
+           (ang_le < 150) & (ang_re < 150)
+
+    # 4) Point Up
+    up_l = arm_l & (y(LW) < y(LS) - 0.15) & (ang_le > 150)
+    up_r = arm_r & (y(RW) < y(RS) - 0.15) & (ang_re > 150)
+
+    # 5) Samurai
+    arm_l_horizontal = arm_l & (ang_le > 150) & (np.abs(y(LW) - y(LS)) <= 0.10 * s)
+    arm_r_horizontal = arm_r & (ang_re > 150) & (np.abs(y(RW) - y(RS)) <= 0.10 * s)
+    hand_on_hip_l = ok(LW, LH) & (d(LW, LH) <= 0.55 * s)
+    hand_on_hip_r = ok(RW, RH) & (d(RW, RH) <= 0.55 * s)
+    samurai = (arm_l_horizontal & hand_on_hip_r) | (arm_r_horizontal & hand_on_hip_l)
+
+    # 6) Stop
+    head_top_y = np.minimum(np.minimum(y(NOSE), y(LEYE)), y(REYE))
+    def is_stop(w, e, sh, ang_e):
+        return (d(w, NOSE) <= 0.45 * s) & (y(w) < y(sh) - 0.02 * s) & \
+               (y(w) >= head_top_y - 0.12 * s) & (ang_e < 150) & \
+               (Z[_I[w]] < Z[_I[e]] - 0.03) & (np.abs(x(w) - x(NOSE)) <= 0.30 * s)
+    stop = ok(LW, RW, NOSE, LS, RS, LE, RE, LEYE, REYE) & \
+           ((arm_l & is_stop(LW, LE, LS, ang_le)) | (arm_r & is_stop(RW, RE, RS, ang_re)))
+
+    conds = [tough, muscle, what, up_l & ~up_r, up_r & ~up_l, samurai, stop]
+    ids = [LABEL_ID[l] for l in ("Tough Guy Pose", "Muscle Man Pose", "What? Pose", "Point Up Pose (L)",
+                                 "Point Up Pose (R)", "Samurai Pose", "Stop Pose")]
+    return np.select(conds, ids, 0).astype(np.uint8)
+
+if __name__ == "__main__":
+    # Self-check: classify_batch must agree with classify_pose frame for frame.
+    import time
+    rng = np.random.default_rng(0)
+    n = 100_000
+    frames = np.empty((n, 33, 4), np.float32)
+    frames[..., :2] = rng.uniform(-0.1, 1.1, (n, 33, 2))
+    frames[::2, :, :2] = rng.uniform(0.3, 0.7, (n // 2, 33, 2))   # crowded bodies hit more rules
+    frames[..., 2] = rng.uniform(-0.3, 0.3, (n, 33))
+    frames[..., 3] = rng.uniform(0.3, 1.0, (n, 33))
+
+    t0 = time.perf_counter()
+    batch = classify_batch(frames)
+    t_batch = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scalar = [LABEL_ID[classify_pose(landmarks_from_array(f))] for f in frames]
+    t_scalar = time.perf_counter() - t0
 
+    bad = np.flatnonzero(batch != np.array(scalar))
+    counts = np.bincount(batch, minlength=len(LABELS))
+    for label, c in zip(LABELS, counts):
+        print(f"  {label or '(none)':20} {c}")
+    print(f"scalar {n / t_scalar:,.0f} frames/s, batch {n / t_batch:,.0f} frames/s")
+    if len(bad):
+        raise SystemExit(f"{len(bad)} frames disagree, first at {bad[0]}")
+    print("classify_batch matches classify_pose")
@@ -0,0 +1,103 @@
+# recording.py
+"""
+On-disk landmark traces for replay, benchmarks and offline analysis.
+
+A trace is a directory of raw little-endian arrays that np.memmap can open
+without parsing:
+
+  meta.json       {"version": 1, "frames": N, "landmarks": 33}
+  t.f64           capture timestamps (wall clock), N float64
+  landmarks.f32   x, y, z, visibility, N * 33 * 4 float32 (NaN when not tracking)
+  label.u8        per-frame classify_pose result as poses.LABELS ids, N uint8
+  truth.u8        optional: the pose actually held, same ids, UNLABELLED where
+                  nobody annotated the frame (evaluate.py scores against it)
+
+Frames are appended as they arrive, so a trace cut short by a crash is
+still readable (meta.json is rewritten on close; load() trusts file sizes).
+"""
+import os, json
+import numpy as np
+from poses import LABEL_ID
+
+VERSION = 1
+N_LANDMARKS = 33
+UNLABELLED = 255
+
+class TraceWriter:
+    def __init__(self, path, n_landmarks=N_LANDMARKS):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.n_landmarks = n_landmarks
+        self.frames = 0
+        self._t = open(os.path.join(path, "t.f64"), "wb")
+        self._lm = open(os.path.join(path, "landmarks.f32"), "wb")
+        self._label = open(os.path.join(path, "label.u8"), "wb")
+        self._missing = np.full((n_landmarks, 4), np.nan, np.float32).tobytes()
+
+    def write(self, t, lm, label=""):
+        """lm is an (n, 4) array or None when not tracking."""
+        self._t.write(np.float64(t).tobytes())
+        self._lm.write(self._missing if lm is None else np.asarray(lm, np.float32).tobytes())
+        self._label.write(bytes((LABEL_ID.get(label or "", 255),)))
+        self.frames += 1
+
+    def close(self):
+        for f in (self._t, self._lm, self._label):
+            f.close()
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({"version": VERSION, "frames": self.frames, "landmarks": self.n_landmarks}, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Trace:
+    """Read-only, memory-mapped view of a trace directory."""
+    def __init__(self, path):
+        self.path = path
+        n_lm = N_LANDMARKS
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("version") != VERSION:
+                raise ValueError(f"{path}: unsupported trace version {meta.get('version')}")
+            n_lm = meta["landmarks"]
+        size = lambda name: os.path.getsize(os.path.join(path, name))
+        # A crash can leave the files one partial frame apart; keep whole frames only
+        n = min(size("t.f64") // 8, size("landmarks.f32") // (n_lm * 16), size("label.u8"))
+        self.t = self._map("t.f64", np.float64, (n,))
+        self.landmarks = self._map("landmarks.f32", np.float32, (n, n_lm, 4))
+        self.labels = self._map("label.u8", np.uint8, (n,))
+        self.truth = None
+        truth_path = os.path.join(path, "truth.u8")
+        if os.path.exists(truth_path):
+            self.truth = np.full(n, UNLABELLED, np.uint8)
+            truth = np.fromfile(truth_path, np.uint8, n)
+            self.truth[:len(truth)] = truth
+
+    def _map(self, name, dtype, shape):
+        if shape[0] == 0:
+            return np.zeros(shape, dtype)
+        return np.memmap(os.path.join(self.path, name), dtype, "r", shape=shape)
+
+    def __len__(self):
+        return len(self.t)
+
+    @property
+    def tracking(self):
+        return ~np.isnan(self.landmarks[:, 0, 0])
+
+    def frame(self, i):
+        """Landmarks of frame i as an (n, 4) array, or None when not tracking."""
+        lm = self.landmarks[i]
+        return None if np.isnan(lm[0, 0]) else np.asarray(lm)
+
+def write_truth(path, ids):
+    """Store ground-truth label ids (one per frame) for the trace at path."""
+    np.asarray(ids, np.uint8).tofile(os.path.join(path, "truth.u8"))
+
+def load(path):
+    return Trace(path)
@@ -0,0 +1,59 @@
+# replay.py
+"""
+Stream a recorded trace (see recording.py) to the UDP address as if it came
+from the camera: same voting/debounce, packet formats and sender as main.py.
+
+  python replay.py session/                 # original speed
+  python replay.py session/ --speed 4       # 4x
+  python replay.py session/ --max           # as fast as possible (throughput test)
+"""
+import socket, time, types, argparse
+from main import ADDR, FORMATS, Sample, Sender
+from poses import classify_pose, landmarks_from_array, LABELS
+from delta import DeltaEncoder
+from recording import Trace
+
+def results_from_array(lm):
+    """Minimal stand-in for MediaPipe's pose results."""
+    if lm is None:
+        return types.SimpleNamespace(pose_landmarks=None)
+    return types.SimpleNamespace(pose_landmarks=types.SimpleNamespace(landmark=landmarks_from_array(lm)))
+
+def replay(trace, sender, speed=1.0, reclassify=False):
+    """speed=None replays as fast as possible. Returns (frames, seconds)."""
+    t0_trace = float(trace.t[0]) if len(trace) else 0.0
+    start = time.perf_counter()
+    for i in range(len(trace)):
+        t = float(trace.t[i])
+        if speed:
+            delay = start + (t - t0_trace) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        lm = trace.frame(i)
+        s = Sample(None, t)
+        s.results = results_from_array(lm)
+        if lm is not None:
+            s.label = classify_pose(s.results.pose_landmarks.landmark) if reclassify else LABELS[trace.labels[i]]
+        sender.emit(s, now=t)
+    return len(trace), time.perf_counter() - start
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay a landmark trace over UDP.")
+    ap.add_argument("trace", help="trace directory written by main.py --record")
+    ap.add_argument("--host", default=ADDR[0])
+    ap.add_argument("--port", type=int, default=ADDR[1])
+    ap.add_argument("--format", choices=FORMATS, default="json")
+    ap.add_argument("--speed", type=float, default=1.0, help="playback speed multiplier")
+    ap.add_argument("--max", action="store_true", help="ignore timestamps and send as fast as possible")
+    ap.add_argument("--reclassify", action="store_true",
+                    help="rerun classify_pose instead of using the recorded labels")
+    args = ap.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender = Sender(sock, (args.host, args.port), args.format, DeltaEncoder())
+    n, secs = replay(Trace(args.trace), sender, None if args.max else args.speed, args.reclassify)
+    print(f"{n} frames in {secs:.2f}s ({n / max(secs, 1e-9):,.0f} frames/s)")
+
+if __name__ == "__main__":
+    main()
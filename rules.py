@@ -0,0 +1,312 @@
+# rules.py
+"""
+Data-driven pose rules: pose_rules.json compiled into one Python function.
+
+The config has three sections:
+
+  thresholds   name -> number; inlined as constants when compiling
+  features     name -> expression; shared sub-results such as "scale"
+  rules        [{"label": ..., "when": [expr, ...]}], first match wins
+
+Expressions are Python syntax over landmarks (full PoseLandmark names or
+the short ALIASES below), thresholds and features:
+
+  vis(A, B, ...)   every landmark visible and in frame (poses.vis_ok)
+  dist(A, B)       image-plane distance        x(A), y(A), z(A)
+  angle(A, B, C)   angle at B in degrees       abs, min, max
+  and / or / not, comparisons (chains too), + - *, "a if cond else b"
+
+compile_rules() turns the whole rule set into a single function whose
+features are locals computed on first use and reused by later rules, so
+each vis/dist/angle is evaluated at most once per frame. Operands of every
+and/or are reordered cheapest first (vis checks and coordinate compares
+before distances and angles); that is safe because every expression is
+side-effect free and total.
+
+RuleSet.watch() polls the file's mtime on a daemon thread and swaps in
+the recompiled function, so thresholds can be tuned while the camera
+runs; a config that fails to compile is reported and the old rules stay.
+
+`python rules.py` checks the compiled default rules against
+poses.classify_batch and prints per-frame timings.
+"""
+import os, ast, json, math, time, threading
+from poses import M, LABELS, vis_ok, angle
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pose_rules.json")
+VERSION = 1
+
+ALIASES = {
+    "LW": "LEFT_WRIST", "RW": "RIGHT_WRIST",
+    "LE": "LEFT_ELBOW", "RE": "RIGHT_ELBOW",
+    "LS": "LEFT_SHOULDER", "RS": "RIGHT_SHOULDER",
+    "LH": "LEFT_HIP", "RH": "RIGHT_HIP",
+    "LK": "LEFT_KNEE", "RK": "RIGHT_KNEE",
+    "LEYE": "LEFT_EYE", "REYE": "RIGHT_EYE",
+}
+
+# Rough relative cost of computing each primitive once; only used for ordering
+COST = {"vis": 1.0, "coord": 0.3, "dist": 2.0, "angle": 6.0, "op": 0.2, "call": 0.5}
+
+_CMP = {ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=", ast.Eq: "==", ast.NotEq: "!="}
+_BIN = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*"}
+
+def landmark_index(name):
+    name = ALIASES.get(name, name)
+    try:
+        return M[name].value
+    except KeyError:
+        return None
+
+class _Compiler:
+    def __init__(self, spec):
+        self.thresholds = spec.get("thresholds", {})
+        self.features = spec.get("features", {})
+        self.points = set()         # landmark indices read by the function
+        self.memo = []              # memoized locals, in first-use order
+        self.bodies = {}            # feature name -> (src, cost), compiled once
+        self.stack = []             # features being compiled, to catch cycles
+        self.where = ""
+
+    def error(self, msg):
+        return ValueError(f"{self.where}: {msg}")
+
+    def expr(self, src):
+        try:
+            tree = ast.parse(src, mode="eval")
+        except SyntaxError as e:
+            raise self.error(f"bad expression {src!r}: {e.msg}") from None
+        return self.node(tree.body)
+
+    def cached(self, var, body):
+        if var not in self.memo:
+            self.memo.append(var)
+        return f"({var} if {var} is not None else ({var} := {body}))"
+
+    def point(self, node):
+        i = landmark_index(node.id) if isinstance(node, ast.Name) else None
+        if i is None:
+            raise self.error(f"expected a landmark name, got {ast.unparse(node)!r}")
+        self.points.add(i)
+        return i
+
+    def node(self, n):
+        """Returns (python source, estimated cost) for one AST node."""
+        if isinstance(n, ast.BoolOp):
+            parts = sorted((self.node(v) for v in n.values), key=lambda p: p[1])
+            op = " and " if isinstance(n.op, ast.And) else " or "
+            return "(" + op.join(p[0] for p in parts) + ")", sum(p[1] for p in parts)
+        if isinstance(n, ast.UnaryOp) and isinstance(n.op, (ast.Not, ast.USub)):
+            src, cost = self.node(n.operand)
+            return f"({'not ' if isinstance(n.op, ast.Not) else '-'}{src})", cost
+        if isinstance(n, ast.BinOp) and type(n.op) in _BIN:
+            (a, ca), (b, cb) = self.node(n.left), self.node(n.right)
+            return f"({a} {_BIN[type(n.op)]} {b})", ca + cb + COST["op"]
+        if isinstance(n, ast.Compare) and all(type(op) in _CMP for op in n.ops):
+            src, cost = self.node(n.left)
+            for op, right in zip(n.ops, n.comparators):
+                r, c = self.node(right)
+                src, cost = f"{src} {_CMP[type(op)]} {r}", cost + c + COST["op"]
+            return f"({src})", cost
+        if isinstance(n, ast.IfExp):
+            (t, ct), (a, ca), (b, cb) = self.node(n.test), self.node(n.body), self.node(n.orelse)
+            return f"({a} if {t} else {b})", ct + max(ca, cb)
+        if isinstance(n, ast.Constant) and isinstance(n.value, (int, float)):
+            return repr(n.value), 0.0
+        if isinstance(n, ast.Name):
+            return self.name(n.id)
+        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and not n.keywords:
+            return self.call(n.func.id, n.args)
+        raise self.error(f"unsupported expression {ast.unparse(n)!r}")
+
+    def name(self, name):
+        if name in self.thresholds:
+            value = self.thresholds[name]
+            if not isinstance(value, (int, float)):
+                raise self.error(f"threshold {name!r} is not a number")
+            return f"({value!r})", 0.0
+        if name in self.features:
+            if name in self.stack:
+                raise self.error(f"feature {name!r} refers to itself")
+            if name not in self.bodies:
+                where, self.where = self.where, f"feature {name!r}"
+                self.stack.append(name)
+                self.bodies[name] = self.expr(self.features[name])
+                self.stack.pop()
+                self.where = where
+            src, cost = self.bodies[name]
+            return self.cached(f"_f_{name}", src), cost
+        if landmark_index(name) is not None:
+            raise self.error(f"landmark {name!r} used as a value; use x({name}), y({name}) or vis({name})")
+        raise self.error(f"unknown name {name!r}")
+
+    def call(self, fn, args):
+        if fn == "vis" and args:
+            parts = []
+            for a in args:
+                i = self.point(a)
+                parts.append(self.cached(f"_v{i}", f"_vis_ok(_p{i}, {self.threshold('visibility', 0.6)!r})"))
+            return "(" + " and ".join(parts) + ")", COST["vis"] * len(args)
+        if fn in ("x", "y", "z") and len(args) == 1:
+            return f"_p{self.point(args[0])}.{fn}", COST["coord"]
+        if fn == "dist" and len(args) == 2:
+            i, j = sorted(map(self.point, args))    # dist is symmetric; share one local
+            return self.cached(f"_d{i}_{j}", f"_hypot(_p{i}.x - _p{j}.x, _p{i}.y - _p{j}.y)"), COST["dist"]
+        if fn == "angle" and len(args) == 3:
+            i, j, k = map(self.point, args)
+            return self.cached(f"_a{i}_{j}_{k}", f"_angle(_p{i}, _p{j}, _p{k})"), COST["angle"]
+        if fn in ("abs", "min", "max") and args and (fn != "abs" or len(args) == 1):
+            parts = [self.node(a) for a in args]
+            return f"{fn}({', '.join(p[0] for p in parts)})", sum(p[1] for p in parts) + COST["call"]
+        raise self.error(f"unknown function {fn}() with {len(args)} arguments")
+
+    def threshold(self, name, default):
+        value = self.thresholds.get(name, default)
+        if not isinstance(value, (int, float)):
+            raise self.error(f"threshold {name!r} is not a number")
+        return value
+
+def compile_rules(spec, filename="<rules>"):
+    """Compile a parsed rules config into fn(lms) -> label ('' when nothing matches).
+
+    Returns (fn, source) so the generated code can be inspected.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"{filename}: expected an object at the top level")
+    if spec.get("version", VERSION) != VERSION:
+        raise ValueError(f"{filename}: unsupported rules version {spec.get('version')}")
+    for key in ("thresholds", "features"):
+        if not isinstance(spec.get(key, {}), dict):
+            raise ValueError(f"{filename}: {key!r} must be an object")
+    for name, src in spec.get("features", {}).items():
+        if not isinstance(src, str):
+            raise ValueError(f"{filename}: feature {name!r} must be an expression string")
+    rules = spec.get("rules", [])
+    if not isinstance(rules, list):
+        raise ValueError(f"{filename}: 'rules' must be a list")
+    c = _Compiler(spec)
+    checks = []
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict):
+            raise ValueError(f"{filename}: rule {i} must be an object")
+        label = rule.get("label")
+        c.where = f"{filename}: rule {i} ({label!r})"
+        if not isinstance(label, str) or label not in LABELS or not label:
+            raise c.error("label is not in poses.LABELS (append new labels there first)")
+        when = rule.get("when", [])
+        if isinstance(when, str):
+            when = [when]
+        if not isinstance(when, list) or not all(isinstance(src, str) for src in when):
+            raise c.error("'when' must be an expression string or a list of them")
+        if not when:
+            raise c.error("empty 'when'")
+        parts = sorted((c.expr(src) for src in when), key=lambda p: p[1])
+        checks.append((" and ".join(p[0] for p in parts), label))
+
+    points = sorted(c.points)
+    lines = ["def classify(lms):"]
+    if points:
+        lines.append("    " + ", ".join(f"_p{i}" for i in points) + ", = "
+                     + ", ".join(f"lms[{i}]" for i in points) + ",")
+    if c.memo:
+        lines.append("    " + " = ".join(c.memo) + " = None")
+    for cond, label in checks:
+        lines.append(f"    if {cond}:")
+        lines.append(f"        return {label!r}")
+    lines.append("    return ''")
+    source = "\n".join(lines) + "\n"
+
+    namespace = {"_vis_ok": vis_ok, "_angle": angle, "_hypot": math.hypot}
+    exec(compile(source, filename, "exec"), namespace)
+    return namespace["classify"], source
+
+def load_rules(path=DEFAULT_PATH):
+    with open(path) as f:
+        try:
+            spec = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+    return compile_rules(spec, path)
+
+class RuleSet:
+    """A compiled rules file; rs.classify(lms) is the generated function itself."""
+    def __init__(self, path=DEFAULT_PATH):
+        self.load(path)
+
+    def load(self, path=None):
+        """(Re)compile from path (default: the current file); raises on a bad config."""
+        path = path or self.path
+        mtime = os.stat(path).st_mtime_ns
+        self.classify, self.source = load_rules(path)
+        self.path, self.mtime = path, mtime
+
+    def reload(self):
+        """Recompile if the file changed since the last load; keeps the old rules on error."""
+        try:
+            if os.stat(self.path).st_mtime_ns == self.mtime:
+                return False
+            t0 = time.perf_counter()
+            self.load()
+        except (OSError, ValueError) as e:
+            self._keep(e)
+            return False
+        print(f"rules: reloaded {self.path} in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        return True
+
+    def _keep(self, e):
+        print(f"rules: keeping previous rules: {e}")
+        try:
+            self.mtime = os.stat(self.path).st_mtime_ns     # don't retry until it changes again
+        except OSError:
+            pass
+
+    def watch(self, interval=1.0):
+        """Hot-reload on a daemon thread while the camera keeps running."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as e:      # never let a bad edit stop the watcher
+                    self._keep(e)
+
+        threading.Thread(target=loop, name="rules-watch", daemon=True).start()
+        return self
+
+_default = None
+
+def default():
+    """Process-wide RuleSet behind poses.classify_pose, loaded from DEFAULT_PATH on first use."""
+    global _default
+    if _default is None:
+        _default = RuleSet()
+    return _default
+
+if __name__ == "__main__":
+    import numpy as np
+    from poses import LABEL_ID, classify_batch, landmarks_from_array
+
+    t0 = time.perf_counter()
+    rs = RuleSet()
+    print(f"compiled {rs.path} in {(time.perf_counter() - t0) * 1000:.1f} ms "
+          f"({len(rs.source.splitlines())} lines of generated code)")
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    frames = np.empty((n, 33, 4), np.float32)
+    frames[..., :2] = rng.uniform(-0.1, 1.1, (n, 33, 2))
+    frames[::2, :, :2] = rng.uniform(0.3, 0.7, (n // 2, 33, 2))   # crowded bodies hit more rules
+    frames[..., 2] = rng.uniform(-0.3, 0.3, (n, 33))
+    frames[..., 3] = rng.uniform(0.3, 1.0, (n, 33))
+    lms = [landmarks_from_array(f) for f in frames]
+
+    classify = rs.classify
+    t0 = time.perf_counter()
+    labels = [classify(l) for l in lms]
+    secs = time.perf_counter() - t0
+
+    bad = np.flatnonzero(classify_batch(frames) != np.array([LABEL_ID[l] for l in labels]))
+    print(f"{n / secs:,.0f} frames/s, {secs / n * 1e6:.2f} us/frame")
+    if len(bad):
+        raise SystemExit(f"{len(bad)} frames disagree with classify_batch, first at {bad[0]}")
+    print("compiled rules match classify_batch")
@@ -0,0 +1,165 @@
+# schedule.py
+"""
+Send scheduling and edge delivery (main.py --send-rate / --repeat-edges).
+
+  SendScheduler   decouples the network rate from the camera: Sender.emit
+                  still votes on every frame, but only hands the newest
+                  state to the scheduler, whose thread sends it every
+                  1 / rate seconds. Frames in between are coalesced; a
+                  `changed` edge among them is carried over to the next
+                  packet unless the gesture went back to what was last sent
+  Edges           numbers gesture changes (event ids, 1..65535 wrapping)
+                  and marks the `repeat` packets after each one `changed`
+                  too, so one lost datagram no longer loses the edge
+  Receiver        the client side: drops stale/duplicate packets by seq,
+                  counts losses and reports each event id once
+
+Every packet carries `seq` (per sender, i.e. per player) and `event`, the
+id of the latest gesture change.
+
+`python schedule.py` sends a synthetic gesture stream through a lossy
+loopback and counts the edges a receiver sees with and without repeats.
+"""
+import time, threading
+
+class Edges:
+    def __init__(self, repeat=0):
+        self.repeat = repeat        # extra packets that carry each edge
+        self.event = 0
+        self.left = 0
+
+    def mark(self, changed):
+        """Per sent packet: returns (changed, event id) for it."""
+        if changed:
+            self.event = self.event % 0xFFFF + 1
+            self.left = self.repeat
+        elif self.left:
+            self.left -= 1
+            changed = True
+        return changed, self.event
+
+class SendScheduler:
+    def __init__(self, send, rate):
+        self.send = send            # fn(sample, gesture, changed), called on the scheduler thread
+        self.period = 1.0 / rate
+        self._lock = threading.Lock()
+        self._latest = None         # (sample, gesture) not sent yet
+        self._changed = False
+        self._sent_gesture = ""
+        self._stop = threading.Event()
+        self._thread = None
+        self.coalesced = 0          # frames replaced by a newer one before their tick
+        self.ticks = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="send", daemon=True)
+        self._thread.start()
+        return self
+
+    def offer(self, s, gesture, changed):
+        s.t_queued = time.perf_counter()
+        with self._lock:
+            if self._latest is not None:
+                self.coalesced += 1
+            self._latest = (s, gesture)
+            self._changed = self._changed or changed
+
+    def _take(self):
+        with self._lock:
+            latest, changed = self._latest, self._changed
+            self._latest, self._changed = None, False
+        if latest is None:
+            return None
+        s, gesture = latest
+        # A -> B -> A between two ticks: nothing changed as far as the receiver knows
+        changed = changed and gesture != self._sent_gesture
+        self._sent_gesture = gesture
+        return s, gesture, changed
+
+    def _run(self):
+        due = time.perf_counter()
+        while not self._stop.is_set():
+            due += self.period
+            delay = due - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            elif delay < -self.period:
+                due = time.perf_counter()       # fell behind; don't burst to catch up
+            self.ticks += 1
+            item = self._take()
+            if item is not None:
+                s = item[0]
+                s.lat["q_tick"] = round((time.perf_counter() - s.t_queued) * 1000.0, 2)
+                self.send(*item)
+
+    def stop(self):
+        """Stop the thread and send whatever is still pending."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        item = self._take()
+        if item is not None:
+            self.send(*item)
+
+class Receiver:
+    """
+    Per-player client state over decoded packets (JSON dicts or wire.decode output).
+    count_gaps=False for a rate-limited fan-out subscription (fanout.py), whose
+    seq gaps are skipped frames rather than lost packets; stale packets are
+    still dropped.
+    """
+    def __init__(self, count_gaps=True):
+        self.count_gaps = count_gaps
+        self.expect = None          # next seq
+        self.lost = 0
+        self.stale = 0              # late or duplicate packets dropped
+        self.event = None           # last event id acted on
+
+    def feed(self, pkt):
+        """Returns None for a stale packet, else whether it brings a gesture change not seen yet."""
+        seq = pkt["seq"]
+        if self.expect is not None:
+            gap = (seq - self.expect) & 0xFFFFFFFF
+            if gap >= 0x80000000:       # behind: reordered or duplicated
+                self.stale += 1
+                return None
+            if self.count_gaps:
+                self.lost += gap
+        self.expect = (seq + 1) & 0xFFFFFFFF
+        if pkt["changed"] and pkt.get("event") != self.event:
+            self.event = pkt.get("event")
+            return True
+        return False
+
+if __name__ == "__main__":
+    import random
+    from main import Sample
+    from stabilizer import synthetic_labels
+
+    labels, times, _ = synthetic_labels(9000, flip=0.0)
+    truth = sum(a != b for a, b in zip(labels, labels[1:]))
+    rng = random.Random(0)
+    print(f"{truth} gesture changes in {len(labels)} frames; packets dropped at random")
+    print(f"{'loss':>5} {'repeat':>6} {'edges seen':>10} {'repeats dropped':>15}")
+    for loss in (0.0, 0.05, 0.2):
+        for repeat in (0, 2):
+            edges, rx, seen, dup = Edges(repeat), Receiver(), 0, 0
+            prev = labels[0]
+            for seq, label in enumerate(labels[1:]):
+                changed, event = edges.mark(label != prev)
+                prev = label
+                if rng.random() < loss:
+                    continue
+                new = rx.feed({"seq": seq, "changed": changed, "event": event})
+                seen += bool(new)
+                dup += changed and not new
+            print(f"{loss:5.0%} {repeat:6} {seen:10} {dup:15}")
+
+    # coalescing: 30 fps camera, 10 Hz network
+    sent = []
+    sched = SendScheduler(lambda s, g, c: sent.append((g, c)), rate=10.0).start()
+    for label in labels[:150]:
+        sched.offer(Sample(None, time.time()), label, False)
+        time.sleep(1 / 30)
+    sched.stop()
+    print(f"scheduler: 150 frames at 30 fps -> {len(sent)} packets at 10 Hz, {sched.coalesced} coalesced")
@@ -0,0 +1,277 @@
+# shmring.py
+"""
+Shared-memory transport for consumers on the same machine (main.py --shm).
+
+Instead of JSON over UDP, every frame is written as a fixed-layout record
+into a memory-mapped ring of `slots` records. Readers map the same file
+and poll the head counter, so the newest pose costs a few memory reads:
+no syscalls, no copies through the kernel and no parsing.
+
+File layout, little endian (default path /dev/shm/udp_sender.ring):
+
+  header (64 bytes)
+     0  magic b"UPRB"     4  version u16     6  reserved u16
+     8  slots u32        12  record size u32 16  landmarks u32
+    32  head u64         sequence number of the newest complete record
+  record i at 64 + i * 576, holding sequence number seq at i = seq % slots
+     0  seq u64          written first
+     8  t f64           16  t_cap f64       24  fps f32
+    28  flags u8        29  gesture u8      30  raw u8      31  player u8
+    32  n u8            (landmarks present; 0 when not tracking)
+    34  event u16       id of the latest gesture change (see wire.py)
+    40  landmarks f32[33][4]  x, y, z, visibility
+   568  seq_end u64      written last
+
+flags, gesture and raw mean the same as in wire.py. Reads are lock-free:
+the writer stores seq, the payload, seq_end, then head (writer threads in
+one process, e.g. one send thread per player, take a lock around that). A reader takes
+head, reads seq_end, copies the record and re-reads seq; the copy is whole
+when both equal head, otherwise the writer lapped it and it retries.
+Sequence numbers start at 1; head 0 means nothing written yet.
+
+With several players (main.py --source) all of them share one ring; use
+RingReader.new() and the "player" field rather than latest().
+
+RingReader is the Python client. `python shmring.py` compares delivery
+latency and reader cost against JSON over UDP.
+"""
+import os, mmap, time, struct, tempfile, threading
+import numpy as np
+import wire
+
+MAGIC = b"UPRB"
+VERSION = 1
+N_LANDMARKS = 33
+HEADER = struct.Struct("<4sHHIII")
+HEAD_OFFSET = 32
+HEADER_SIZE = 64
+RECORD = np.dtype({
+    "names": ["seq", "t", "t_cap", "fps", "flags", "gesture", "raw", "player", "n", "event", "lm", "seq_end"],
+    "formats": ["<u8", "<f8", "<f8", "<f4", "u1", "u1", "u1", "u1", "u1", "<u2", ("<f4", (N_LANDMARKS, 4)), "<u8"],
+    "offsets": [0, 8, 16, 24, 28, 29, 30, 31, 32, 34, 40, 568],
+    "itemsize": 576,
+})
+
+DEFAULT_PATH = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                            "udp_sender.ring")
+
+class RingWriter:
+    def __init__(self, path=DEFAULT_PATH, slots=64):
+        self.path = path
+        self.slots = slots
+        size = HEADER_SIZE + slots * RECORD.itemsize
+        self._file = open(path, "w+b")
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, 0, slots, RECORD.itemsize, N_LANDMARKS)
+        self._head = np.frombuffer(self._mm, "<u8", 1, HEAD_OFFSET)
+        self._rec = np.frombuffer(self._mm, RECORD, slots, HEADER_SIZE)
+        self.seq = 0
+        self._lock = threading.Lock()     # several send threads may publish into one ring
+
+    def write(self, lm, t, t_cap, fps, gesture, changed, raw="", flags=0, player=0, event=0):
+        """lm is an (n, 4) array or None when not tracking; returns the record's sequence number."""
+        with self._lock:
+            self.seq = seq = self.seq + 1
+            r = self._rec[seq % self.slots]         # a view into the mapping
+            r["seq"] = seq
+            r["t"], r["t_cap"], r["fps"] = t, t_cap, fps
+            if lm is not None:
+                flags |= wire.TRACKING
+                r["n"] = len(lm)
+                r["lm"][:len(lm)] = lm
+            else:
+                r["n"] = 0
+            if changed:
+                flags |= wire.CHANGED
+            r["flags"], r["gesture"], r["raw"], r["player"] = flags, wire.label_id(gesture), wire.label_id(raw), player
+            r["event"] = event & 0xFFFF
+            r["seq_end"] = seq
+            self._head[0] = seq
+        return seq
+
+    def publish(self, s, fps, gesture, changed, seq):
+        """Sender hook, same arguments as the packet encoders in main.py."""
+        flags = wire.HELD if s.held else 0
+        if s.labels_only and s.results.pose_landmarks is not None:
+            lm, flags = None, flags | wire.TRACKING
+        else:
+            lm = s.landmarks()
+        self.write(lm, time.time(), s.t_cap, fps, gesture, changed, s.label, flags, s.player, s.event)
+
+    def close(self):
+        self._head = self._rec = None       # views must go before the mapping
+        self._mm.close()
+        self._file.close()
+
+class RingReader:
+    """Polls a ring written by RingWriter; never blocks the writer."""
+    def __init__(self, path=DEFAULT_PATH):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, slots, size, n_lm = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a UDP-sender ring")
+        if version != VERSION or size != RECORD.itemsize or n_lm != N_LANDMARKS:
+            raise ValueError(f"{path}: unsupported ring version {version} (record size {size})")
+        self.slots = slots
+        self._head = np.frombuffer(self._mm, "<u8", 1, HEAD_OFFSET)
+        self._rec = np.frombuffer(self._mm, RECORD, slots, HEADER_SIZE)
+        self.last = 0               # sequence number of the last record returned
+        self.lost = 0               # records overwritten before this reader saw them
+
+    @property
+    def head(self):
+        return int(self._head[0])
+
+    def _copy(self, seq):
+        """Record `seq` as a private copy, or None if the writer has overwritten it."""
+        i = seq % self.slots
+        for _ in range(3):
+            end = int(self._rec["seq_end"][i])
+            rec = self._rec[i].copy()
+            if end == seq and int(self._rec["seq"][i]) == seq:
+                return rec
+            if end > seq:
+                return None
+        return None
+
+    def latest(self):
+        """Newest record not returned yet (as a dict like wire.decode), or None."""
+        head = self.head
+        if head == self.last:
+            return None
+        rec = self._copy(head)
+        if rec is None:             # lapped between reading head and the record; take the new head
+            return self.latest()
+        if self.last and head > self.last + 1:
+            self.lost += head - self.last - 1
+        self.last = head
+        return to_dict(rec)
+
+    def new(self):
+        """Every record since the previous call, oldest first (for several players)."""
+        head, out = self.head, []
+        start = max(self.last + 1, head - self.slots + 1)
+        if self.last:
+            self.lost += start - self.last - 1
+        for seq in range(start, head + 1):
+            rec = self._copy(seq)
+            if rec is None:
+                self.lost += 1
+            else:
+                out.append(to_dict(rec))
+        self.last = max(self.last, head)
+        return out
+
+    def wait(self, timeout=None, poll=0.0005):
+        """latest(), sleeping `poll` seconds between checks; None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            rec = self.latest()
+            if rec is not None or (deadline is not None and time.monotonic() >= deadline):
+                return rec
+            time.sleep(poll)
+
+    def close(self):
+        self._head = self._rec = None
+        self._mm.close()
+        self._file.close()
+
+def to_dict(rec):
+    flags, n = int(rec["flags"]), int(rec["n"])
+    raw = wire.label_name(int(rec["raw"]))
+    return {
+        "seq": int(rec["seq"]),
+        "player": int(rec["player"]),
+        "t": float(rec["t"]),
+        "t_cap": float(rec["t_cap"]),
+        "fps": float(rec["fps"]),
+        "flags": flags,
+        "tracking": bool(flags & wire.TRACKING),
+        "landmarks": rec["lm"][:n] if n else None,
+        "gestures_raw": [raw] if raw else [],
+        "gesture": wire.label_name(int(rec["gesture"])),
+        "changed": bool(flags & wire.CHANGED),
+        "event": int(rec["event"]),
+        "held": bool(flags & wire.HELD),
+    }
+
+# ---------- latency comparison ----------
+def _produce(kind, path, port, n, hz):
+    """Child process: n frames at hz through one transport, stamped with time.time()."""
+    import json, socket
+    from delta import synthetic_session
+    frames = synthetic_session(n)
+    if kind == "shm":
+        ring = RingWriter(path)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    time.sleep(0.5)                 # let the consumer get ready
+    for i, lm in enumerate(frames):
+        t = time.time()
+        if kind == "shm":
+            ring.write(lm, t, t, 30.0, "Stop Pose", False, "Stop Pose")
+        else:
+            pkt = {"t": t, "t_cap": t, "fps": 30.0, "tracking": True,
+                   "landmarks": [{"id": j, "x": round(float(p[0]), 3), "y": round(float(p[1]), 3),
+                                  "z": round(float(p[2]), 3), "v": round(float(p[3]), 3)}
+                                 for j, p in enumerate(lm)],
+                   "gestures_raw": ["Stop Pose"], "gesture": "Stop Pose", "changed": False}
+            sock.sendto(json.dumps(pkt, separators=(",",":")).encode("utf-8"), ("127.0.0.1", port))
+        time.sleep(1.0 / hz)
+
+def _consume(kind, path, port, n):
+    import json, socket
+    lat, cost = [], []
+    if kind == "shm":
+        reader = None
+        while reader is None:
+            try:
+                reader = RingReader(path)
+            except (OSError, ValueError):
+                time.sleep(0.01)
+        while len(lat) < n:
+            t0 = time.perf_counter()
+            rec = reader.latest()
+            if rec is None:
+                continue            # busy poll: the best case for latency
+            cost.append(time.perf_counter() - t0)
+            lat.append(time.time() - rec["t"])
+            if rec["seq"] >= n:
+                break
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", port))
+        sock.settimeout(5.0)
+        try:
+            while len(lat) < n:
+                buf = sock.recv(65535)
+                t0 = time.perf_counter()
+                pkt = json.loads(buf)
+                cost.append(time.perf_counter() - t0)
+                lat.append(time.time() - pkt["t"])
+        except socket.timeout:
+            pass
+    return np.asarray(lat) * 1e6, np.asarray(cost) * 1e6
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing as mp_proc
+    ap = argparse.ArgumentParser(description="Compare shared-memory and UDP delivery latency.")
+    ap.add_argument("--frames", type=int, default=2000)
+    ap.add_argument("--hz", type=float, default=200.0)
+    ap.add_argument("--port", type=int, default=54598)
+    args = ap.parse_args()
+
+    path = DEFAULT_PATH + ".bench"
+    print(f"{args.frames} frames at {args.hz:.0f} Hz; microseconds, writer -> reader")
+    print(f"{'transport':10} {'lat p50':>8} {'lat p99':>8} {'read p50':>9}")
+    for kind in ("udp+json", "shm"):
+        proc = mp_proc.Process(target=_produce, args=(kind, path, args.port, args.frames, args.hz))
+        proc.start()
+        lat, cost = _consume(kind, path, args.port, args.frames)
+        proc.join()
+        print(f"{kind:10} {np.percentile(lat, 50):8.1f} {np.percentile(lat, 99):8.1f} "
+              f"{np.percentile(cost, 50):9.1f}")
+    os.unlink(path)
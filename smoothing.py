@@ -0,0 +1,181 @@
+# smoothing.py
+"""
+Landmark smoothing between pose.process and classify_pose (main.py --smooth).
+
+MediaPipe's landmarks jitter by a few thousandths from frame to frame even
+when the player stands still, which flips borderline rules and is why the
+stabilizer votes over 10 frames. These filters run on all 33 landmarks'
+x/y/z at once as (33, 3) NumPy arrays, so a frame costs a handful of array
+operations whatever the filter:
+
+  OneEuro   One Euro filter (Casiez et al.): a low-pass whose cutoff rises
+            with speed, so still landmarks are smoothed hard and fast ones
+            are followed with little lag
+  Kalman    constant-velocity Kalman filter per coordinate, with the 2x2
+            covariance kept as three arrays (P00, P01, P11)
+
+Both are visibility-aware: a landmark the model is unsure about (low
+visibility) is trusted less, i.e. it gets a lower cutoff / a larger
+measurement noise, so occluded joints drift instead of jumping. State is
+dropped when tracking is lost or frames are more than `reset_after`
+seconds apart.
+
+`f.apply(lms, t)` filters MediaPipe landmarks in place (what main.infer
+calls, so packets carry the smoothed values); `f.filter(lm, t)` filters a
+(33, 4) array. `python smoothing.py [TRACE]` reports jitter, lag and
+per-frame label flips with each filter.
+"""
+import math
+import numpy as np
+
+# Stable gesture window with smoothing on; the cleaner labels need fewer frames
+SMOOTHED_WINDOW = 5
+
+class _Filter:
+    def __init__(self, vis_floor=0.2, reset_after=0.5):
+        self.vis_floor = vis_floor
+        self.reset_after = reset_after
+        self.t = None               # time of the last filtered frame
+
+    def reset(self):
+        self.t = None
+
+    def filter(self, lm, t):
+        """Smoothed copy of a (33, 4) landmark array (visibility passes through); None resets."""
+        if lm is None:
+            self.reset()
+            return None
+        out = lm.copy()
+        out[:, :3] = self._step(lm[:, :3], lm[:, 3:4], t)
+        return out
+
+    def apply(self, lms, t):
+        """Smooth MediaPipe landmarks in place; t is the frame time in seconds."""
+        lm = np.array([(p.x, p.y, p.z, p.visibility) for p in lms], dtype=np.float64)
+        for p, (x, y, z) in zip(lms, self._step(lm[:, :3], lm[:, 3:4], t).tolist()):
+            p.x, p.y, p.z = x, y, z
+
+    def _step(self, xyz, vis, t):
+        dt = None if self.t is None else t - self.t
+        self.t = t
+        w = np.clip(vis, self.vis_floor, 1.0)
+        if dt is None or dt <= 0.0 or dt > self.reset_after or xyz.shape != self.x.shape:
+            self._init(xyz)
+            return self.x
+        return self._update(xyz, w, dt)
+
+class OneEuro(_Filter):
+    def __init__(self, min_cutoff=1.0, beta=20.0, d_cutoff=1.0, **kw):
+        super().__init__(**kw)
+        self.min_cutoff = min_cutoff    # Hz, for still landmarks
+        self.beta = beta                # cutoff gain per unit/s of speed
+        self.d_cutoff = d_cutoff        # Hz, for the speed estimate
+        self.x = np.zeros((0, 3))
+        self.dx = None
+
+    @staticmethod
+    def _alpha(dt, cutoff):
+        return 1.0 / (1.0 + 1.0 / (2.0 * math.pi * cutoff * dt))
+
+    def _init(self, xyz):
+        self.x = xyz.astype(np.float64)
+        self.dx = np.zeros_like(self.x)
+
+    def _update(self, xyz, w, dt):
+        a_d = self._alpha(dt, self.d_cutoff)
+        self.dx += a_d * ((xyz - self.x) / dt - self.dx)
+        cutoff = (self.min_cutoff + self.beta * np.abs(self.dx)) * w
+        a = self._alpha(dt, cutoff)
+        self.x += a * (xyz - self.x)
+        return self.x
+
+class Kalman(_Filter):
+    def __init__(self, q=0.3, r=3e-5, **kw):
+        super().__init__(**kw)
+        self.q = q                      # acceleration noise density, (units/s^2)^2 * s
+        self.r = r                      # measurement variance at visibility 1
+        self.x = np.zeros((0, 3))
+
+    def _init(self, xyz):
+        self.x = xyz.astype(np.float64)
+        self.v = np.zeros_like(self.x)
+        self.p00 = np.full_like(self.x, self.r)
+        self.p01 = np.zeros_like(self.x)
+        self.p11 = np.full_like(self.x, 1.0)
+
+    def _update(self, xyz, w, dt):
+        q = self.q
+        # predict
+        self.x += self.v * dt
+        self.p00 += dt * (2.0 * self.p01 + dt * self.p11) + q * dt ** 3 / 3.0
+        self.p01 += dt * self.p11 + q * dt ** 2 / 2.0
+        self.p11 += q * dt
+        # update with R = r / w^2: low visibility, noisy measurement
+        s = self.p00 + self.r / (w * w)
+        k0, k1 = self.p00 / s, self.p01 / s
+        y = xyz - self.x
+        self.x += k0 * y
+        self.v += k1 * y
+        self.p11 -= k1 * self.p01
+        self.p01 *= 1.0 - k0
+        self.p00 *= 1.0 - k0
+        return self.x
+
+FILTERS = {"euro": OneEuro, "kalman": Kalman}
+
+def make(name):
+    """Filter by name, or None for 'none' / None."""
+    return FILTERS[name]() if name and name != "none" else None
+
+# ---------- comparison ----------
+def _run(f, frames, t):
+    out = frames.copy()
+    for i, lm in enumerate(frames):
+        if np.isnan(lm[0, 0]):      # not tracking (traces store NaN)
+            f.reset()
+        else:
+            out[i] = f.filter(lm, t[i])
+    return out
+
+def _flips(labels):
+    return sum(a != b for a, b in zip(labels, labels[1:]))
+
+if __name__ == "__main__":
+    import sys, time
+    from delta import synthetic_session
+
+    if len(sys.argv) > 1:
+        from recording import Trace
+        from poses import classify_batch
+        trace = Trace(sys.argv[1])
+        frames, t = np.asarray(trace.landmarks, dtype=np.float64), np.asarray(trace.t, dtype=np.float64)
+        minutes = max(1e-9, t[-1] - t[0]) / 60.0
+        print(f"{len(frames)} frames; per-frame label flips per minute")
+        print(f"{'none':8} {_flips(classify_batch(frames)) / minutes:8.1f}")
+        for name, cls in FILTERS.items():
+            out = _run(cls(), frames, t)
+            print(f"{name:8} {_flips(classify_batch(out)) / minutes:8.1f}")
+        raise SystemExit
+
+    # Synthetic: true motion plus MediaPipe-like jitter; a still and a waving landmark
+    n, fps = 900, 30.0
+    t = np.arange(n) / fps
+    truth = synthetic_session(n).astype(np.float64)
+    truth[:, :, :3] = truth[0, :, :3]
+    truth[:, 15, :2] += 0.1 * np.sin(np.arange(n) / 10.0)[:, None]
+    noisy = truth.copy()
+    noisy[:, :, :3] += np.random.default_rng(1).normal(0.0, 0.003, (n, 33, 3))
+    still = [i for i in range(33) if i != 15]
+
+    print(f"{'filter':8} {'still jitter':>12} {'wave rmse':>10} {'us/frame':>9}")
+    for name, out in [("none", noisy)] + [(k, None) for k in FILTERS]:
+        if out is None:
+            f = FILTERS[name]()
+            t0 = time.perf_counter()
+            out = _run(f, noisy, t)
+            us = (time.perf_counter() - t0) / n * 1e6
+        else:
+            us = 0.0
+        jitter = np.abs(np.diff(out[30:, still, :2], axis=0)).mean()
+        rmse = np.sqrt(((out[30:, 15, :2] - truth[30:, 15, :2]) ** 2).mean())
+        print(f"{name:8} {jitter:12.5f} {rmse:10.5f} {us:9.1f}")
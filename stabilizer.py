@@ -0,0 +1,251 @@
+# stabilizer.py
+"""
+Turn noisy per-frame labels into a stable `gesture` plus a `changed` edge.
+
+Every strategy has the same interface:
+
+    gesture, changed = stab.update(label, now=None, weight=1.0)
+
+where `now` is the frame time in seconds (wall clock by default) and
+`weight` is a per-frame confidence (see confidence()); only strategies with
+weighted = True look at it. Window bookkeeping is incremental: each update
+adds one entry, evicts expired ones and adjusts running per-label totals,
+so the cost doesn't grow with the window.
+
+  MajorityVote   the original main.py rule: most common non-empty label in
+                 the last WINDOW frames (or window_ms), debounced by COOLDOWN
+  WeightedVote   MajorityVote with confidence-weighted votes
+  Hysteresis     enter a label when it holds `enter` of the window, leave it
+                 only when it drops below `exit`
+
+`python stabilizer.py [TRACE ...]` compares strategies on recorded traces.
+"""
+import time
+from collections import deque
+
+WINDOW = 10                 # frames to vote over
+COOLDOWN = 0.25             # seconds min between changes (debounce)
+
+# Landmarks the pose rules look at (nose, eyes, shoulders, elbows, wrists, hips)
+CONFIDENCE_IDS = [0, 2, 5, 11, 12, 13, 14, 15, 16, 23, 24]
+
+def confidence(lm):
+    """Mean visibility of the landmarks classify_pose uses; 0 when not tracking."""
+    if lm is None:
+        return 0.0
+    return float(lm[CONFIDENCE_IDS, 3].mean())
+
+class _Window:
+    """Sliding window of (t, label, weight) with running per-label count and weight."""
+    def __init__(self, frames=None, seconds=None):
+        self.entries = deque()
+        self.frames = frames
+        self.seconds = seconds
+        self.totals = {}            # label -> [count, weight]
+        self.weight = 0.0
+
+    def add(self, t, label, weight):
+        self.entries.append((t, label, weight))
+        tot = self.totals.get(label)
+        if tot is None:
+            self.totals[label] = [1, weight]
+        else:
+            tot[0] += 1
+            tot[1] += weight
+        self.weight += weight
+
+        if self.frames is not None and len(self.entries) > self.frames:
+            self._pop()
+        if self.seconds is not None:
+            while self.entries and self.entries[0][0] <= t - self.seconds:
+                self._pop()
+
+    def _pop(self):
+        _, label, weight = self.entries.popleft()
+        tot = self.totals[label]
+        tot[0] -= 1
+        if tot[0] == 0:
+            del self.totals[label]      # drop instead of subtracting to avoid float drift
+        else:
+            tot[1] -= weight
+        self.weight = self.weight - weight if self.entries else 0.0
+
+    def full(self):
+        if self.frames is not None:
+            return len(self.entries) >= self.frames
+        return True
+
+    def leader(self, by_weight=False):
+        """Most common non-empty label; ties go to the label seen first, like Counter.most_common."""
+        k = 1 if by_weight else 0
+        best, tied = None, []
+        for label, tot in self.totals.items():
+            if not label:
+                continue
+            if best is None or tot[k] > best:
+                best, tied = tot[k], [label]
+            elif tot[k] == best:
+                tied.append(label)
+        if len(tied) <= 1:
+            return tied[0] if tied else ""
+        for _, label, _ in self.entries:
+            if label in tied:
+                return label
+
+    def share(self, label, by_weight=False):
+        tot = self.totals.get(label)
+        if tot is None:
+            return 0.0
+        if by_weight:
+            return tot[1] / self.weight if self.weight > 0 else 0.0
+        return tot[0] / len(self.entries)
+
+class MajorityVote:
+    """Majority of non-empty labels over `window` frames, or `window_ms` when given."""
+    weighted = False
+
+    def __init__(self, window=WINDOW, cooldown=COOLDOWN, window_ms=None, min_frames=1):
+        if window_ms is not None:
+            self.win = _Window(seconds=window_ms / 1000.0)
+        else:
+            self.win = _Window(frames=window)
+        self.cooldown = cooldown
+        self.min_frames = min_frames
+        self.last_stable = ""
+        self.last_change = 0.0
+
+    def _switch(self, voted, now):
+        if voted != self.last_stable and (now - self.last_change) >= self.cooldown:
+            self.last_stable = voted
+            self.last_change = now
+            return True
+        return False
+
+    def update(self, label_now, now=None, weight=1.0):
+        now = time.time() if now is None else now
+        self.win.add(now, label_now, weight if self.weighted else 1.0)
+        changed = False
+        if self.win.full() and len(self.win.entries) >= self.min_frames:
+            changed = self._switch(self.win.leader(self.weighted), now)
+        return self.last_stable, changed
+
+    def state(self):
+        """Vote counts in the current window, for debug overlays."""
+        k = 1 if self.weighted else 0
+        return {label: round(tot[k], 2) for label, tot in self.win.totals.items()}
+
+class WeightedVote(MajorityVote):
+    """MajorityVote where each frame counts with its confidence instead of 1."""
+    weighted = True
+
+class Hysteresis(MajorityVote):
+    """
+    Adopt a label once it holds `enter` of the window; keep it until its share
+    falls below `exit`, then fall back to the leader if it qualifies, else "".
+    The window is `window` frames or `window_ms`; 200 ms when neither is given.
+    """
+    def __init__(self, enter=0.6, exit=0.3, window=None, window_ms=None, cooldown=0.0, weighted=False, **kw):
+        if window is None and window_ms is None:
+            window_ms = 200
+        super().__init__(window=window, cooldown=cooldown, window_ms=window_ms, **kw)
+        self.enter = enter
+        self.exit = exit
+        self.weighted = weighted
+
+    def update(self, label_now, now=None, weight=1.0):
+        now = time.time() if now is None else now
+        w = self.win
+        w.add(now, label_now, weight if self.weighted else 1.0)
+        if len(w.entries) < self.min_frames:
+            return self.last_stable, False
+
+        cur = self.last_stable
+        if cur and w.share(cur, self.weighted) >= self.exit:
+            return cur, False
+        leader = w.leader(self.weighted)
+        target = leader if leader and w.share(leader, self.weighted) >= self.enter else ""
+        if target == cur:
+            return cur, False
+        changed = self._switch(target, now)
+        return self.last_stable, changed
+
+STRATEGIES = {
+    "majority": MajorityVote,
+    "weighted": WeightedVote,
+    "hysteresis": Hysteresis,
+}
+
+def make(name="majority", **kw):
+    """Build a strategy by name; None-valued options fall back to its defaults."""
+    return STRATEGIES[name](**{k: v for k, v in kw.items() if v is not None})
+
+# ---------- comparison on traces ----------
+def edges(stab, labels, times, weights=None):
+    """Run a label stream through stab; returns [(frame, gesture)] for every changed edge."""
+    out = []
+    for i, label in enumerate(labels):
+        _, changed = stab.update(label, times[i], 1.0 if weights is None else weights[i])
+        if changed:
+            out.append((i, stab.last_stable))
+    return out
+
+def latencies(edge_list, labels, times):
+    """Seconds from the start of the raw run of each new label to its edge."""
+    out = []
+    for i, gesture in edge_list:
+        j = i
+        while j > 0 and labels[j] != gesture:
+            j -= 1
+        while j > 0 and labels[j - 1] == gesture:
+            j -= 1
+        out.append(times[i] - times[j])
+    return out
+
+def synthetic_labels(n=9000, fps=30.0, flip=0.08, seed=0):
+    """Poses held 1-4 s with per-frame misclassifications at rate `flip`."""
+    import numpy as np
+    from poses import LABELS, POSE_LABELS
+    LABELS = [l for l in LABELS if not l or l in POSE_LABELS]
+    rng = np.random.default_rng(seed)
+    labels = []
+    while len(labels) < n:
+        label = LABELS[rng.integers(len(LABELS))]
+        labels += [label] * int(rng.uniform(1, 4) * fps)
+    labels = labels[:n]
+    noise = rng.random(n) < flip
+    for i in np.flatnonzero(noise):
+        labels[i] = LABELS[rng.integers(len(LABELS))]
+    return labels, [i / fps for i in range(n)], None
+
+if __name__ == "__main__":
+    import sys
+    import numpy as np
+    from poses import LABELS
+
+    streams = []
+    for path in sys.argv[1:]:
+        from recording import Trace
+        tr = Trace(path)
+        weights = [confidence(tr.frame(i)) for i in range(len(tr))]
+        streams.append(([LABELS[i] for i in tr.labels], [float(t) for t in tr.t], weights))
+    if not streams:
+        streams.append(synthetic_labels())
+
+    configs = [
+        ("majority 10 frames", lambda: MajorityVote()),
+        ("majority 150 ms", lambda: MajorityVote(window_ms=150)),
+        ("weighted 150 ms", lambda: WeightedVote(window_ms=150)),
+        ("hysteresis 0.6/0.3 200 ms", lambda: Hysteresis()),
+        ("hysteresis 0.5/0.25 150 ms", lambda: Hysteresis(0.5, 0.25, window_ms=150)),
+    ]
+    print(f"{'strategy':28} {'edges':>6} {'short':>6} {'lat p50':>8} {'lat p90':>8}  (ms; short = held < 0.5 s)")
+    for name, factory in configs:
+        n_edges = short = 0
+        lat = []
+        for labels, times, weights in streams:
+            e = edges(factory(), labels, times, weights)
+            n_edges += len(e)
+            lat += latencies(e, labels, times)
+            short += sum(1 for (a, _), (b, _) in zip(e, e[1:]) if times[b] - times[a] < 0.5)
+        lat = np.asarray(lat) * 1000.0 if lat else np.zeros(1)
+        print(f"{name:28} {n_edges:6d} {short:6d} {np.percentile(lat, 50):8.0f} {np.percentile(lat, 90):8.0f}")
@@ -0,0 +1,144 @@
+# stats.py
+"""
+Per-stage timing for the sender: rolling latency histograms plus two ways
+to read them while main.py runs.
+
+  --stats-port 54546     JSON datagram to host:54546 every --stats-interval s
+  --stats-http 8765      plain-text table at http://127.0.0.1:8765/
+
+Recording a frame is a dict walk and one bisect per stage under one
+uncontended lock (with --send-rate each Sender records from its own send
+thread, and multicam.py's Senders share one StageStats).
+"""
+import json, time, socket, threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bucket upper bounds in ms: 0.01 ms .. ~6 s, 20% apart
+BOUNDS = [0.01 * 1.2 ** i for i in range(74)]
+
+class RollingHistogram:
+    """Log-bucketed histogram of the last `window` seconds, kept as `slices` sub-histograms."""
+    def __init__(self, window=10.0, slices=5):
+        self.slice_len = window / slices
+        self.buckets = [[0] * (len(BOUNDS) + 1) for _ in range(slices)]
+        self.sums = [0.0] * slices
+        self.maxes = [0.0] * slices
+        self.cur = 0
+        self.slice_end = time.monotonic() + self.slice_len
+
+    def _rotate(self, now):
+        while now >= self.slice_end:
+            self.cur = (self.cur + 1) % len(self.buckets)
+            self.buckets[self.cur] = [0] * (len(BOUNDS) + 1)
+            self.sums[self.cur] = 0.0
+            self.maxes[self.cur] = 0.0
+            self.slice_end += self.slice_len
+
+    def add(self, ms, now):
+        if now >= self.slice_end:
+            self._rotate(now)
+        self.buckets[self.cur][bisect_left(BOUNDS, ms)] += 1
+        self.sums[self.cur] += ms
+        if ms > self.maxes[self.cur]:
+            self.maxes[self.cur] = ms
+
+    def summary(self, now=None):
+        self._rotate(time.monotonic() if now is None else now)
+        merged = [sum(col) for col in zip(*self.buckets)]
+        n = sum(merged)
+        if n == 0:
+            return {"n": 0}
+        out = {"n": n, "mean": round(sum(self.sums) / n, 3), "max": round(max(self.maxes), 3)}
+        for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            rank, acc = q * n, 0
+            for i, c in enumerate(merged):
+                acc += c
+                if acc >= rank:
+                    out[name] = round(BOUNDS[min(i, len(BOUNDS) - 1)], 3)
+                    break
+        return out
+
+class StageStats:
+    """One RollingHistogram per stage name, fed with Sample.lat dicts."""
+    def __init__(self, window=10.0):
+        self.window = window
+        self.stages = {}
+        self.frames = 0
+        self.started = time.monotonic()
+        self.counters = {}              # name -> live dict of counts, e.g. AdaptiveInference.counters
+        self._lock = threading.Lock()
+
+    def add_counters(self, name, counts):
+        """Report a dict that some stage keeps up to date alongside the timings."""
+        self.counters[name] = counts
+
+    def record(self, lat, now=None):
+        now = time.monotonic() if now is None else now
+        stages = self.stages
+        with self._lock:
+            for name, ms in lat.items():
+                h = stages.get(name)
+                if h is None:
+                    h = stages[name] = RollingHistogram(self.window)
+                h.add(ms, now)
+            self.frames += 1
+
+    def snapshot(self):
+        now = time.monotonic()
+        # summary() rotates the histograms too, so it runs under the lock record() takes
+        with self._lock:
+            stages = {name: h.summary(now) for name, h in self.stages.items()}
+            frames = self.frames
+        return {
+            "t": time.time(),
+            "frames": frames,
+            "uptime": round(now - self.started, 1),
+            "window_s": self.window,
+            "stages": stages,
+            "counters": {name: dict(counts) for name, counts in self.counters.items()},
+        }
+
+    def text(self):
+        snap = self.snapshot()
+        lines = [f"frames {snap['frames']}  uptime {snap['uptime']}s  window {snap['window_s']}s (ms)",
+                 f"{'stage':12} {'n':>7} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}"]
+        for name, s in snap["stages"].items():
+            if s["n"]:
+                lines.append(f"{name:12} {s['n']:7d} {s['mean']:8.2f} {s['p50']:8.2f} "
+                             f"{s['p90']:8.2f} {s['p99']:8.2f} {s['max']:8.2f}")
+        for name, counts in snap["counters"].items():
+            lines.append(f"{name}: " + "  ".join(f"{k} {v}" for k, v in counts.items()))
+        return "\n".join(lines) + "\n"
+
+def start_datagrams(stats, addr, interval=1.0):
+    """Send stats.snapshot() as a JSON datagram to addr every `interval` seconds."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            sock.sendto(json.dumps(stats.snapshot(), separators=(",",":")).encode("utf-8"), addr)
+
+    threading.Thread(target=loop, name="stats-udp", daemon=True).start()
+
+def start_http(stats, port, host="127.0.0.1"):
+    """Serve stats.text() on http://host:port/ (and JSON on /json)."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/json"):
+                body, ctype = json.dumps(stats.snapshot()).encode("utf-8"), "application/json"
+            else:
+                body, ctype = stats.text().encode("utf-8"), "text/plain; charset=utf-8"
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="stats-http", daemon=True).start()
+    return server
@@ -0,0 +1,176 @@
+# viewer.py
+"""
+Debug overlay for the live pipeline (main.py --view, or pose_debug.py).
+
+The window is drawn on its own thread from the newest frame and
+landmarks, so drawing, imshow and waitKey never sit in the capture ->
+inference -> send path:
+
+  offer(s, release)         inference stage: takes over s.frame (no copy)
+                            and hands it back with release(frame) as soon
+                            as it is copied into the display buffer; a
+                            frame the viewer hasn't picked up yet is
+                            released and replaced, so a slow window drops
+                            frames instead of holding up the pipeline
+  voted(s, gesture, votes)  Sender: the stable gesture, the stabilizer's
+                            vote counts (stab.state()) and the sample's
+                            per-stage timings, as copies
+
+The overlay shows the skeleton, per-frame label and stable gesture, the
+votes in the window, the latest per-stage milliseconds, the sender's FPS
+and the frames the viewer dropped. All window calls happen on the viewer
+thread; ESC closes the window and leaves the sender running.
+
+`python viewer.py TRACE` plays a recorded trace's skeletons on a blank
+frame through the same path.
+"""
+import time, threading
+from collections import deque
+import cv2
+import numpy as np
+
+WINDOW = "UDP sender - debug"
+
+# mp.solutions.pose.POSE_CONNECTIONS; spelled out so the viewer doesn't import mediapipe
+CONNECTIONS = (
+    (0, 1), (0, 4), (1, 2), (2, 3), (3, 7), (4, 5), (5, 6), (6, 8), (9, 10), (11, 12), (11, 13), (11, 23),
+    (12, 14), (12, 24), (13, 15), (14, 16), (15, 17), (15, 19), (15, 21), (16, 18), (16, 20), (16, 22),
+    (17, 19), (18, 20), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28), (27, 29), (27, 31), (28, 30),
+    (28, 32), (29, 31), (30, 32))
+VIS = 0.5                   # landmarks drawn at or above this visibility
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+WHITE, PINK, GREEN, GREY = (255, 255, 255), (255, 225, 255), (80, 220, 80), (160, 160, 160)
+
+class Viewer:
+    def __init__(self, size=(960, 540)):
+        from main import LatestSlot         # main imports this module lazily
+        self.size = size
+        self._slot = LatestSlot(lambda item: item[1](item[0]))
+        self._lock = threading.Lock()
+        self._vote = ("", {}, {})           # gesture, votes, lat of the last voted sample
+        self._sent = deque(maxlen=30)       # perf_counter of recent voted() calls, for the sender FPS
+        self._disp = None
+        self._stop = False
+        self.closed = False
+        self.frames = 0
+        self._thread = None
+
+    @property
+    def dropped(self):
+        return self._slot.dropped
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="viewer", daemon=True)
+        self._thread.start()
+        return self
+
+    def offer(self, s, release):
+        """Take s.frame for display; release(frame) returns it (the caller must not touch it again)."""
+        if self.closed:
+            release(s.frame)
+            return
+        self._slot.put((s.frame, release, s.results, s.label))
+
+    def voted(self, s, gesture, votes):
+        self._sent.append(time.perf_counter())
+        with self._lock:
+            self._vote = (gesture, votes, dict(s.lat))
+
+    def fps(self):
+        sent = list(self._sent)
+        if len(sent) < 2 or time.perf_counter() - sent[-1] > 1.0:
+            return 0.0
+        return (len(sent) - 1) / max(1e-9, sent[-1] - sent[0])
+
+    def close(self):
+        self._stop = True
+        self._slot.close()
+        if self._thread is not None:
+            self._thread.join(2.0)
+
+    def _run(self):
+        try:
+            cv2.namedWindow(WINDOW, cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO)
+            cv2.resizeWindow(WINDOW, *self.size)
+            while not self._stop:
+                item = self._slot.get(timeout=0.1)
+                if item is not None:
+                    cv2.imshow(WINDOW, self.render(*item))
+                    self.frames += 1
+                # also while paused, so the window stays responsive
+                if (cv2.waitKey(1) & 0xFF) == 27:
+                    break
+            cv2.destroyWindow(WINDOW)
+        finally:
+            self.closed = True
+            self._slot.close()
+            item = self._slot.get()
+            if item is not None:
+                item[1](item[0])
+
+    def render(self, frame, release, results, label):
+        """Draw one frame (mirrored, like the landmarks) and give the camera buffer back."""
+        try:
+            disp = self._disp = cv2.flip(frame, 1, dst=self._disp)
+        finally:
+            release(frame)
+        with self._lock:
+            gesture, votes, lat = self._vote
+        h, w = disp.shape[:2]
+
+        if results.pose_landmarks is not None:
+            lms = results.pose_landmarks.landmark
+            pts = [(int(p.x * w), int(p.y * h)) if p.visibility >= VIS else None for p in lms]
+            for i, j in CONNECTIONS:
+                if pts[i] is not None and pts[j] is not None:
+                    cv2.line(disp, pts[i], pts[j], WHITE, 2, cv2.LINE_AA)
+            for pt in pts:
+                if pt is not None:
+                    cv2.circle(disp, pt, 3, GREEN, -1, cv2.LINE_AA)
+
+        def text(s, y, color=WHITE, x=8, scale=0.5):
+            cv2.putText(disp, s, (x, y), FONT, scale, color, 1, cv2.LINE_AA)
+
+        text(f"send {self.fps():4.1f} fps  dropped {self.dropped}", 20, scale=0.6)
+        text(f"pose: {label or '(none)'}", 44, PINK, scale=0.6)
+        text(f"gesture: {gesture or '(none)'}", 68, PINK, scale=0.6)
+        y = 96
+        for name, n in sorted(votes.items(), key=lambda kv: -kv[1]):
+            text(f"{n:5.1f}  {name or '(none)'}", y, GREEN if name == gesture else GREY)
+            y += 18
+        y = 20
+        for stage, ms in lat.items():
+            text(f"{stage:>8} {ms:7.2f} ms", y, x=w - 170)
+            y += 18
+        return disp
+
+if __name__ == "__main__":
+    import sys
+    from recording import Trace
+    from replay import results_from_array
+    from poses import LABELS
+    from main import Sample
+    from stabilizer import MajorityVote
+
+    if len(sys.argv) < 2:
+        raise SystemExit("usage: python viewer.py TRACE")
+    trace = Trace(sys.argv[1])
+    viewer = Viewer().start()
+    stab = MajorityVote()
+    blank = np.zeros((480, 640, 3), np.uint8)
+    free = [blank.copy() for _ in range(3)]
+    t0, start = float(trace.t[0]), time.perf_counter()
+    for i in range(len(trace)):
+        delay = start + float(trace.t[i]) - t0 - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if viewer.closed:
+            break
+        s = Sample(free.pop() if free else blank.copy(), float(trace.t[i]))
+        s.results = results_from_array(trace.frame(i))
+        s.label = LABELS[trace.labels[i]] if s.results.pose_landmarks is not None else ""
+        viewer.offer(s, free.append)
+        gesture, _ = stab.update(s.label, s.t_cap)
+        viewer.voted(s, gesture, stab.state())
+    viewer.close()
+    print(f"{viewer.frames} frames drawn, {viewer.dropped} dropped")
@@ -0,0 +1,158 @@
+# wire.py
+"""
+Compact binary packet format, an alternative to the JSON packets built by
+main.to_packet(). Little endian:
+
+  header  magic b"UP", version u8, flags u8, seq u32, t f64, t_cap f64,
+          fps f32, gesture u8, raw u8, player u8, n u8, event u16  (34 bytes)
+  body    [ids[n] u8                     (DELTA packets only)]
+          x[n] i16, y[n] i16, z[n] i16   (value * 10000, clamped)
+          v[n] u8                        (visibility * 255)
+
+gesture/raw are indices into poses.LABELS (0 = no pose, 255 = unknown label);
+player is the source id from multicam.py (0 for a single camera). event
+is the id of the latest gesture change (see schedule.py; 0 = none yet):
+with --repeat-edges a CHANGED packet is repeated in the following packets
+under the same event id, so receivers act on each id once. Version 1
+packets (32-byte header, no event) still decode.
+A full 33-landmark frame is 265 bytes. KEYFRAME/DELTA packets come from
+delta.py: a DELTA carries only the landmarks listed in ids and is applied
+on top of the previous packet.
+
+Run `python wire.py` to compare size and encode/decode time against JSON.
+"""
+import struct
+import numpy as np
+from poses import LABELS, LABEL_ID
+
+MAGIC = b"UP"
+VERSION = 2
+HEADER = struct.Struct("<2sBBIddfBBBBH")
+HEADER_V1 = struct.Struct("<2sBBIddfBBBB")
+
+# flags
+TRACKING = 0x01
+CHANGED  = 0x02
+KEYFRAME = 0x04
+DELTA    = 0x08
+HELD     = 0x10      # landmarks repeated from an earlier frame (adaptive.py skipped inference)
+
+UNKNOWN_LABEL = 255
+SCALE = np.array([10000.0, 10000.0, 10000.0, 255.0])
+LO = np.array([-32768, -32768, -32768, 0])
+HI = np.array([32767, 32767, 32767, 255])
+
+def quantize(lm):
+    """(n, 4) float landmarks -> (n, 4) int32 in wire units."""
+    q = np.rint(np.asarray(lm, dtype=np.float64) * SCALE)
+    return np.clip(q, LO, HI).astype(np.int32)
+
+def dequantize(q):
+    return (q / SCALE).astype(np.float32)
+
+def pack_body(q):
+    return q[:, :3].T.astype("<i2").tobytes() + q[:, 3].astype(np.uint8).tobytes()
+
+def unpack_body(buf, n, offset):
+    xyz = np.frombuffer(buf, "<i2", 3 * n, offset).reshape(3, n)
+    v = np.frombuffer(buf, np.uint8, n, offset + 6 * n)
+    q = np.empty((n, 4), np.int32)
+    q[:, :3] = xyz.T
+    q[:, 3] = v
+    return q, offset + 7 * n
+
+def label_id(label):
+    return LABEL_ID.get(label or "", UNKNOWN_LABEL)
+
+def label_name(i):
+    return LABELS[i] if i < len(LABELS) else None
+
+def pack(q, seq, t, t_cap, fps, gesture, changed, raw="", flags=0, ids=None, player=0, event=0):
+    """Like encode() but takes quantized landmarks; ids marks a DELTA body."""
+    if q is not None:
+        flags |= TRACKING
+        body = pack_body(q)
+        n = len(q)
+        if ids is not None:
+            flags |= DELTA
+            body = np.asarray(ids, np.uint8).tobytes() + body
+    else:
+        body, n = b"", 0
+    if changed:
+        flags |= CHANGED
+    head = HEADER.pack(MAGIC, VERSION, flags, seq & 0xFFFFFFFF, t, t_cap, fps,
+                       label_id(gesture), label_id(raw), player, n, event & 0xFFFF)
+    return head + body
+
+def encode(lm, seq, t, t_cap, fps, gesture, changed, raw="", flags=0, player=0, event=0):
+    """lm is an (n, 4) array of x, y, z, visibility, or None when not tracking."""
+    q = quantize(lm) if lm is not None else None
+    return pack(q, seq, t, t_cap, fps, gesture, changed, raw, flags, player=player, event=event)
+
+def decode(buf):
+    """Reference decoder; returns the same fields as the JSON packet, landmarks as an (n, 4) array."""
+    if buf[:2] != MAGIC:
+        raise ValueError("not a UDP-sender packet")
+    if buf[2] == VERSION:
+        _, ver, flags, seq, t, t_cap, fps, gesture, raw, player, n, event = HEADER.unpack_from(buf)
+        offset = HEADER.size
+    elif buf[2] == 1:
+        _, ver, flags, seq, t, t_cap, fps, gesture, raw, player, n = HEADER_V1.unpack_from(buf)
+        offset, event = HEADER_V1.size, 0
+    else:
+        raise ValueError(f"unsupported packet version {buf[2]}")
+    ids = None
+    if flags & DELTA:
+        ids = np.frombuffer(buf, np.uint8, n, offset)
+        offset += n
+    q, _ = unpack_body(buf, n, offset)
+    raw_label = label_name(raw)
+    return {
+        "seq": seq,
+        "player": player,
+        "t": t,
+        "t_cap": t_cap,
+        "fps": fps,
+        "flags": flags,
+        "tracking": bool(flags & TRACKING),
+        "landmarks": dequantize(q),
+        "ids": ids,                    # landmark indices of a DELTA body, else None
+        "gestures_raw": [raw_label] if raw_label else [],
+        "gesture": label_name(gesture),
+        "changed": bool(flags & CHANGED),
+        "event": event,
+        "held": bool(flags & HELD),
+    }
+
+if __name__ == "__main__":
+    import json, time, types
+    from poses import landmarks_from_array
+    from main import to_packet
+
+    rng = np.random.default_rng(0)
+    frames = rng.uniform(0.0, 1.0, (256, 33, 4)).astype(np.float32)
+    results = [types.SimpleNamespace(pose_landmarks=types.SimpleNamespace(landmark=landmarks_from_array(f)))
+               for f in frames]
+    N = 20000
+
+    def bench(fn):
+        t0 = time.perf_counter()
+        for i in range(N):
+            out = fn(i % len(frames))
+        return (time.perf_counter() - t0) / N * 1e6, out
+
+    def enc_json(i):
+        pkt = to_packet(results[i], 30.0, ["Stop Pose"], "Stop Pose", False, True)
+        return json.dumps(pkt, separators=(",",":"), allow_nan=False).encode("utf-8")
+
+    def enc_bin(i):
+        return encode(frames[i], i, time.time(), time.time(), 30.0, "Stop Pose", False, "Stop Pose")
+
+    us_json, buf_json = bench(enc_json)
+    us_bin, buf_bin = bench(enc_bin)
+    us_json_dec, _ = bench(lambda i: json.loads(buf_json))
+    us_bin_dec, _ = bench(lambda i: decode(buf_bin))
+
+    print(f"{'format':8} {'bytes':>6} {'encode us':>10} {'decode us':>10}")
+    print(f"{'json':8} {len(buf_json):6d} {us_json:10.1f} {us_json_dec:10.1f}")
+    print(f"{'binary':8} {len(buf_bin):6d} {us_bin:10.1f} {us_bin_dec:10.1f}")